@@ -3,30 +3,28 @@
 from abc import ABC, abstractmethod
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Generator, List, Optional
+from typing import Dict, Generator, List, Optional, Tuple, Type
 
 from backupbot.abstract.backup_task import AbstractBackupTask
 from backupbot.abstract.storage_info import AbstractStorageInfo
 
 
 class BackupAdapter(ABC):
+    # errors of the adapter's backup tasks which only fail the task raising them, e.g. errors of the container runtime
+    task_errors: Tuple[Type[Exception], ...] = ()
+
     @abstractmethod
-    def discover_config_files(self, root: Path) -> List[Path]:
-        ...
+    def discover_config_files(self, root: Path) -> List[Path]: ...
 
     @abstractmethod
-    def parse_storage_info(self, files: List[Path], root_directory: Path) -> Dict[str, AbstractStorageInfo]:
-        ...
+    def parse_storage_info(self, files: List[Path], root_directory: Path) -> Dict[str, AbstractStorageInfo]: ...
 
     @abstractmethod
-    def generate_backup_config(self, storage_info: Dict[str, AbstractStorageInfo]) -> Optional[Path]:
-        ...
+    def generate_backup_config(self, storage_info: Dict[str, AbstractStorageInfo]) -> Optional[Path]: ...
 
     @abstractmethod
-    def parse_backup_scheme(self, file: Path) -> Dict[str, List[AbstractBackupTask]]:
-        ...
+    def parse_backup_scheme(self, file: Path) -> Dict[str, List[AbstractBackupTask]]: ...
 
     @abstractmethod
     @contextmanager
-    def stopped_system(self, storage_info: Optional[List[AbstractStorageInfo]] = None) -> Generator:
-        ...
+    def stopped_system(self, storage_info: Optional[List[AbstractStorageInfo]] = None) -> Generator: ...
@@ -3,21 +3,32 @@
 """Main Backupbot class."""
 
 import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Literal, Optional
+from typing import Dict, List, Literal, Optional, Tuple, Type
 
 from backupbot.abstract.backup_adapter import BackupAdapter
 from backupbot.abstract.backup_task import AbstractBackupTask
 from backupbot.abstract.storage_info import AbstractStorageInfo
-from backupbot.docker_compose.backup import DockerComposeBackupAdapter
 from backupbot.errors import BackupNotExistingContainerError
 from backupbot.logger import logger
 from backupbot.versioning import update_version_numbers
 
+# services are backed up concurrently, each one may start helper containers and compress data
+MAX_CONCURRENT_SERVICES = 4
+
 
 class BackupBot:
     """Class which coordinates all backup tasks."""
 
+    # errors which only fail the backup task raising them, the adapter adds the errors of its own backup tasks
+    task_errors: Tuple[Type[Exception], ...] = (
+        NotImplementedError,
+        NotADirectoryError,
+        RuntimeError,
+        BackupNotExistingContainerError,
+    )
+
     def __init__(
         self,
         root: Path,
@@ -42,6 +53,9 @@ class BackupBot:
         self.update_major = update_major
 
         if adapter == "docker-compose":
+            # imported here so that only the selected adapter's dependencies (e.g. docker) are loaded
+            from backupbot.docker_compose.backup import DockerComposeBackupAdapter
+
             self.backup_adapter: BackupAdapter = DockerComposeBackupAdapter()
         else:
             raise ValueError(f"Unknown backup adapter: '{adapter}'.")
@@ -66,13 +80,10 @@ class BackupBot:
         """
         for service in storage_info.values():
             if service.name in backup_tasks:
-                dir_names = [type(task).target_dir_name for task in backup_tasks[service.name]]
-                dir_names_unique = set(dir_names)
+                dir_names_unique = {type(task).target_dir_name for task in backup_tasks[service.name]}
 
                 for name in dir_names_unique:
-                    subdir_path = self.dst_directory.joinpath(service.name, name)
-                    if not subdir_path.is_dir():
-                        subdir_path.mkdir(parents=True)
+                    self.dst_directory.joinpath(service.name, name).mkdir(parents=True, exist_ok=True)
 
     def parse_storage_info(self) -> Dict[str, AbstractStorageInfo]:
         """Generates a storage info instance from storage info files found in self.root directory.
@@ -170,33 +181,48 @@ class BackupBot:
         storage_info: Dict[str, AbstractStorageInfo],
         backup_tasks: Dict[str, List[AbstractBackupTask]],
     ) -> Dict[str, int]:
-        stats: Dict[str, int] = {"success": 0, "error": 0}
-        for service_name, tasks in backup_tasks.items():
-            logger.info(f"Running {len(tasks)} backup task(s) for service '{service_name}'...")
-            for task in tasks:
-                task_str = task.__class__.__qualname__
-                try:
-                    logger.info(f"Running '{task.__class__.__qualname__}' for service '{service_name}'...")
-                    task_files = task(
-                        storage_info[service_name],
-                        self.dst_directory.joinpath(service_name, type(task).target_dir_name),
+        # services are independent and write to separate directories, hence they are backed up concurrently; the
+        # tasks of one service run one after another
+        if len(backup_tasks) <= 1:
+            service_stats = [
+                self._run_service_backup_tasks(service_name, tasks, storage_info)
+                for service_name, tasks in backup_tasks.items()
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(backup_tasks), MAX_CONCURRENT_SERVICES)) as executor:
+                service_stats = list(
+                    executor.map(
+                        lambda item: self._run_service_backup_tasks(item[0], item[1], storage_info),
+                        backup_tasks.items(),
                     )
-                    logger.info(f"Finished '{task_str}': {task_files}")
-                    stats["success"] += 1
-                except NotImplementedError as task_init_error:
-                    logger.error(f"Failed to execute backup task '{task_str}': '{task_init_error}'.")
-                    stats["error"] += 1
-                except NotADirectoryError as dir_error:
-                    logger.error(f"Failed to execute backup task '{task_str}': '{dir_error}'.")
-                    stats["error"] += 1
-                except RuntimeError as runtime_error:
-                    logger.error(f"Failed to execute backup task '{task_str}': '{runtime_error}'.")
-                    stats["error"] += 1
-                except BackupNotExistingContainerError as container_error:
-                    logger.error(f"Failed to execute backup task '{task_str}': '{container_error}'.")
-                    stats["error"] += 1
-
-            logger.info(f"Finished backup of service '{service_name}'.")
+                )
+
+        stats: Dict[str, int] = {"success": 0, "error": 0}
+        for service_stat in service_stats:
+            stats["success"] += service_stat["success"]
+            stats["error"] += service_stat["error"]
+        return stats
+
+    def _run_service_backup_tasks(
+        self, service_name: str, tasks: List[AbstractBackupTask], storage_info: Dict[str, AbstractStorageInfo]
+    ) -> Dict[str, int]:
+        stats: Dict[str, int] = {"success": 0, "error": 0}
+        task_errors = self.task_errors + self.backup_adapter.task_errors
+        service_directory = self.dst_directory.joinpath(service_name)
+
+        logger.info(f"Running {len(tasks)} backup task(s) for service '{service_name}'...")
+        for task in tasks:
+            task_str = task.__class__.__qualname__
+            try:
+                logger.info(f"Running '{task_str}' for service '{service_name}'...")
+                task_files = task(storage_info[service_name], service_directory.joinpath(type(task).target_dir_name))
+                logger.info(f"Finished '{task_str}': {task_files}")
+                stats["success"] += 1
+            except task_errors as error:
+                logger.error(f"Failed to execute backup task '{task_str}': '{error}'.")
+                stats["error"] += 1
+
+        logger.info(f"Finished backup of service '{service_name}'.")
         return stats
 
     def generate_backup_config(self, target_directory: Path, filename: str = "backup-config.json") -> None:
@@ -23,6 +23,8 @@ class HostDirectory(BaseModel):
 @dataclass
 @total_ordering
 class FileVersion:
+    __slots__ = ("major", "minor")  # no per-instance __dict__
+
     major: int
     minor: int
 
@@ -52,16 +54,10 @@ class FileVersion:
         if not isinstance(other, FileVersion):
             raise NotImplementedError(f"Unable to compare {type(self)} with objects of type '{type(other)}'.")
 
-        if self.major < other.major:
-            return True
-
-        return self.minor < other.minor
+        return (self.major, self.minor) < (other.major, other.minor)
 
     def __gt__(self, other: Any) -> bool:
         if not isinstance(other, FileVersion):
             raise NotImplementedError(f"Unable to compare {type(self)} with objects of type '{type(other)}'.")
 
-        if self.major > other.major:
-            return True
-
-        return self.minor > other.minor
+        return (self.major, self.minor) > (other.major, other.minor)
@@ -3,11 +3,15 @@
 """Module containing the backup adapter for docker-compose."""
 
 import json
+import re
 from contextlib import contextmanager
+from functools import cached_property
+from math import ceil
 from pathlib import Path
-from typing import Dict, Generator, List, Tuple, Union
+from typing import Dict, Generator, List, Tuple, Type, Union
 
-from docker import DockerClient, from_env
+from docker import DockerClient
+from docker.errors import APIError
 
 from backupbot.abstract.backup_adapter import BackupAdapter
 from backupbot.abstract.backup_task import AbstractBackupTask
@@ -18,21 +22,40 @@ from backupbot.docker_compose.backup_tasks import (
     DockerVolumeBackupTask,
 )
 from backupbot.docker_compose.container_utils import (
-    docker_compose_start,
-    docker_compose_stop,
+    get_docker_client,
+    start_containers,
+    stop_containers,
 )
 from backupbot.docker_compose.storage_info import DockerComposeService
 from backupbot.logger import logger
 from backupbot.utils import load_yaml_file, match_files
 
+DURATION_UNITS_S = {"us": 1e-6, "ms": 1e-3, "s": 1, "m": 60, "h": 3600}
+DURATION_PART_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(us|ms|s|m|h)")
+DURATION_PATTERN = re.compile(rf"(?:{DURATION_PART_PATTERN.pattern})+")
+
 
 class DockerComposeBackupAdapter(BackupAdapter):
+    task_errors: Tuple[Type[Exception], ...] = (APIError,)
+
     def __init__(self):
-        self.docker_client: DockerClient = from_env()
         self.config_files: List[Path] = []
 
+    @cached_property
+    def docker_client(self) -> DockerClient:
+        """Docker client, connected on first use so that config file handling does not require docker."""
+        return get_docker_client()
+
     def discover_config_files(self, root: Path) -> List[Path]:
-        match_files(root, "docker-compose.yaml", self.config_files)
+        self.config_files = []  # do not accumulate files from previous calls
+
+        # a compose file in the root directory defines the project, the (possibly large) volume data below it does not
+        # need to be searched then
+        root_compose_file = root.joinpath("docker-compose.yaml")
+        if root_compose_file.is_file():
+            self.config_files.append(root_compose_file)
+        else:
+            match_files(root, "docker-compose.yaml", self.config_files)
 
         num_files = len(self.config_files)
         if num_files != 1:
@@ -62,7 +85,7 @@ class DockerComposeBackupAdapter(BackupAdapter):
         if not file.is_file() or not file.suffix.lower() == ".json":
             raise RuntimeError(f"Backup configuration file has wrong suffix or does not exist: '{file}'.")
 
-        with open(file.absolute(), "r") as f:
+        with open(file, "r") as f:
             parsed: Dict[str, List] = json.load(f)
 
         backup_scheme: Dict[str, List[AbstractBackupTask]] = {}
@@ -119,7 +142,9 @@ class DockerComposeBackupAdapter(BackupAdapter):
     def stopped_system(self, storage_info: Dict[str, DockerComposeService] = None) -> Generator:
         """Context manager which stops and restarts the docker-compose system if it is running.
 
-        Note: The system is considered running if any container is running.
+        The containers are stopped and started via the docker API rather than the docker-compose CLI. Like the CLI, the
+        services' 'depends_on' order and 'stop_grace_period' are respected. Only containers which have been running
+        before are restarted afterwards, also when the backup is aborted by an exception.
 
         Args:
             storage_info (List[DockerComposeService], optional): Storage info. Defaults to None.
@@ -127,23 +152,31 @@ class DockerComposeBackupAdapter(BackupAdapter):
         Yields:
             Generator: Yields when the system is down.
         """
-        running_containers = [
-            container.name for container in self.docker_client.containers.list(filters={"status": "running"})
-        ]
-        system_running = any([name in running_containers for name in storage_info.keys()])
-
-        docker_compose_stop(self.config_files[0])  # in case some of the containers were running
+        depends_on = {name: service.depends_on for name, service in storage_info.items()}
+        stop_timeouts = {name: service.stop_grace_period for name, service in storage_info.items()}
+        stopped_containers = stop_containers(
+            self.docker_client, list(storage_info.keys()), depends_on=depends_on, stop_timeouts=stop_timeouts
+        )
 
-        yield None
-
-        if system_running:
-            docker_compose_start(self.config_files[0])
+        try:
+            yield None
+        finally:
+            start_containers(self.docker_client, stopped_containers, depends_on=depends_on)
 
     def _parse_volume(self, volume: str) -> Tuple[str, str]:
-        if not ":" in volume:
+        name, delimiter, remainder = volume.partition(":")
+        if not delimiter:
             raise ValueError(f"Unable to parse volume: Delimiter ':' missing in volume '{volume}'.")
-        split = volume.split(":")
-        return split[0], split[1]
+        return name, remainder.partition(":")[0]  # drop access mode suffixes like ':ro'
+
+    def _parse_duration(self, duration: Union[str, int, float]) -> int:
+        # docker-compose durations like '1m30s' or '500ms', docker expects whole seconds
+        if isinstance(duration, (int, float)):
+            return ceil(duration)
+        if not DURATION_PATTERN.fullmatch(duration):
+            raise ValueError(f"Invalid duration: '{duration}'.")
+        seconds = sum(float(value) * DURATION_UNITS_S[unit] for value, unit in DURATION_PART_PATTERN.findall(duration))
+        return ceil(seconds)
 
     def _parse_compose_file(self, file: Path, root_directory: Path) -> Dict[str, DockerComposeService]:
         compose_content: Dict[str, Dict] = load_yaml_file(file)
@@ -152,6 +185,11 @@ class DockerComposeBackupAdapter(BackupAdapter):
             raise RuntimeError("Failed to parse docker-compose.yaml: File has no 'services' key.")
 
         services: Dict[str, DockerComposeService] = {}
+        # 'depends_on' refers to service names, whereas the containers are handled by their names
+        container_names = {
+            service_name: service_attributes["container_name"]
+            for service_name, service_attributes in compose_content["services"].items()
+        }
 
         for service_name, service_attributes in compose_content["services"].items():
             container_name = service_attributes["container_name"]
@@ -163,7 +201,19 @@ class DockerComposeBackupAdapter(BackupAdapter):
                 hostname=service_attributes["hostname"],
                 volumes=[],
                 bind_mounts=[],
+                # short ('- db') and long ('db: {condition: ...}') syntax, iterating both yields the service names
+                depends_on=[
+                    container_names[dependency]
+                    for dependency in service_attributes.get("depends_on", [])
+                    if dependency in container_names
+                ],
             )
+            if "stop_grace_period" in service_attributes:
+                try:
+                    service.stop_grace_period = self._parse_duration(service_attributes["stop_grace_period"])
+                except ValueError as error:
+                    logger.error(f"Failed to parse stop grace period of service '{service_name}': {error}")
+
             if "volumes" in service_attributes:
                 for volume in service_attributes["volumes"]:
                     try:
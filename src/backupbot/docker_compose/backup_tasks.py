@@ -1,23 +1,29 @@
 #!/usr/bin/env python3
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from shutil import copyfile
 from tempfile import TemporaryDirectory
-from typing import Dict, List
-
-from docker import DockerClient, from_env
+from typing import Dict, List, Tuple
 
 from backupbot.abstract.backup_task import AbstractBackupTask
 from backupbot.data_structures import HostDirectory, Volume
 from backupbot.docker_compose.container_utils import (
     BackupItem,
     container_exists,
+    get_docker_client,
     shell_backup,
 )
 from backupbot.docker_compose.storage_info import DockerComposeService
 from backupbot.errors import BackupNotExistingContainerError
 from backupbot.logger import logger
-from backupbot.utils import path_to_string, tar_file_or_directory, timestamp
+from backupbot.utils import (
+    parallel_gzip_program,
+    path_to_string,
+    tar_file_or_directory,
+    timestamp,
+)
 
 
 class DockerBindMountBackupTask(AbstractBackupTask):
@@ -35,8 +41,7 @@ class DockerBindMountBackupTask(AbstractBackupTask):
             NotImplementedError: When the class has no shared target_dir_name attribute.
         """
         self.bind_mounts = bind_mounts
-
-        self._docker_client: DockerClient = from_env()
+        self._bind_mount_set = frozenset(bind_mounts)  # order-independent comparison and hashing
 
         if kwargs:
             raise NotImplementedError(f"{type(self)} received unknown parameters: {kwargs}")
@@ -45,6 +50,9 @@ class DockerBindMountBackupTask(AbstractBackupTask):
         """Executes the bind mount backup task for docker-compose environments. Creates a sub-folder for each bind mount
         named after the bind mount (if necessary). The bind mount content is tar-compressed a single file.
 
+        Unless 'pigz' compresses each bind mount on all cores, the bind mounts are compressed concurrently in a thread
+        pool. The returned files are nevertheless in the order of the service's bind mounts.
+
         Folder structure after the backup:
 
                 |-bind_mounts
@@ -58,7 +66,7 @@ class DockerBindMountBackupTask(AbstractBackupTask):
         Returns:
             List[Path]: Created files.
         """
-        if not container_exists(self._docker_client, service.container_name):
+        if not container_exists(get_docker_client(), service.container_name):
             raise BackupNotExistingContainerError(f"Container '{service.container_name}' does not exist.")
 
         if self.bind_mounts == ["all"]:
@@ -70,19 +78,25 @@ class DockerBindMountBackupTask(AbstractBackupTask):
                 if any([host_dir.path.match(bind_mount) for bind_mount in self.bind_mounts])
             ]
 
-        created_files: List[Path] = []
+        backup_timestamp = timestamp()  # one timestamp for all bind mounts of the backup
+        tar_jobs: List[Tuple[Path, str, Path]] = []
         for mount in backup_mounts:
             string_path = path_to_string(mount.path, num_steps=1)
             target_dir = backup_task_dir.joinpath(string_path)
-            tar_name = f"{timestamp()}-{string_path}"
+            tar_name = f"{backup_timestamp}-{string_path}"
 
             if not target_dir.is_dir():
                 target_dir.mkdir(parents=False)
 
-            tar_file = tar_file_or_directory(mount.path, tar_name, target_dir)
-            created_files.append(tar_file)
+            tar_jobs.append((mount.path, tar_name, target_dir))
 
-        return created_files
+        if len(tar_jobs) <= 1 or parallel_gzip_program() is not None:
+            # pigz already compresses on all cores, running several of them at once would only oversubscribe the CPU
+            return [tar_file_or_directory(*job) for job in tar_jobs]
+
+        # tar runs in a sub-process, the threads merely wait for it
+        with ThreadPoolExecutor(max_workers=min(len(tar_jobs), os.cpu_count() or 1)) as executor:
+            return list(executor.map(lambda job: tar_file_or_directory(*job), tar_jobs))
 
     def __eq__(self, o: object) -> bool:
         """Equality function.
@@ -93,13 +107,15 @@ class DockerBindMountBackupTask(AbstractBackupTask):
         Returns:
             bool: True if objects are equal.
         """
-        if not isinstance(o, type(self)):
-            return False
+        return isinstance(o, type(self)) and self._bind_mount_set == o._bind_mount_set
 
-        if len(self.bind_mounts) != len(o.bind_mounts):
-            return False
+    def __hash__(self) -> int:
+        """Hash function, consistent with __eq__.
 
-        return len(set(self.bind_mounts).difference(o.bind_mounts)) == 0
+        Returns:
+            int: Hash value.
+        """
+        return hash((type(self), self._bind_mount_set))
 
     def __repr__(self) -> str:
         """Representation function.
@@ -125,8 +141,8 @@ class DockerVolumeBackupTask(AbstractBackupTask):
             NotImplementedError: When the class has no target_dir_name attribute.
         """
         self.volumes = volumes
+        self._volume_set = frozenset(volumes)  # order-independent comparison and hashing
         self._container_backup_bind_mount = Path("/backup")  # must be absolute!
-        self._docker_client: DockerClient = from_env()
 
         if kwargs:
             raise NotImplementedError(f"{type(self)} received unknown parameters: {kwargs}")
@@ -152,7 +168,8 @@ class DockerVolumeBackupTask(AbstractBackupTask):
             storage_info (Dict[str, Dict[str, List]]): DockerComposeService instances containing containers to back up.
             target_dir (Path): Final backup directory
         """
-        if not container_exists(self._docker_client, service.container_name):
+        docker_client = get_docker_client()
+        if not container_exists(docker_client, service.container_name):
             raise BackupNotExistingContainerError(f"Container '{service.container_name}' does not exist.")
 
         backup_files: List[Path] = []
@@ -163,7 +180,7 @@ class DockerVolumeBackupTask(AbstractBackupTask):
             volume_backup_items = self._prepare_volume_backup(service.volumes, target_dir)
 
             backup_mapping = shell_backup(
-                self._docker_client,
+                docker_client,
                 "ubuntu:latest",
                 bind_mount_dir=tmp_dir,
                 container_to_backup=service.name,
@@ -188,9 +205,22 @@ class DockerVolumeBackupTask(AbstractBackupTask):
     def _prepare_volume_backup(self, volumes: List[Volume], target_dir: Path) -> List[BackupItem]:
         backup_items: List[BackupItem] = []
 
+        # the backup file is named after the volume, hence a volume mounted twice would be backed up into the same file
+        unique_volumes: Dict[str, Volume] = {}
+        duplicates: List[str] = []
         for volume in volumes:
+            if volume.name in unique_volumes:
+                duplicates.append(volume.name)
+            else:
+                unique_volumes[volume.name] = volume
+
+        if duplicates:
+            logger.warning(f"Skipped {len(duplicates)} duplicate volume(s): {', '.join(sorted(set(duplicates)))}.")
+
+        backup_timestamp = timestamp()  # one timestamp for all volumes of the backup
+        for volume in unique_volumes.values():
             volume_backup_dir = target_dir.joinpath(volume.name)
-            tar_file_name = f"{timestamp()}-{volume.name}.tar.gz"
+            tar_file_name = f"{backup_timestamp}-{volume.name}.tar.gz"
 
             if not volume_backup_dir.exists():
                 volume_backup_dir.mkdir(parents=False)
@@ -214,13 +244,15 @@ class DockerVolumeBackupTask(AbstractBackupTask):
         Returns:
             bool: Whether or not the object is equal to this instance
         """
-        if not isinstance(o, type(self)):
-            return False
+        return isinstance(o, type(self)) and self._volume_set == o._volume_set
 
-        if len(self.volumes) != len(o.volumes):
-            return False
+    def __hash__(self) -> int:
+        """Hash function, consistent with __eq__.
 
-        return len(set(self.volumes).difference(set(o.volumes))) == 0
+        Returns:
+            int: Hash value.
+        """
+        return hash((type(self), self._volume_set))
 
     def __repr__(self) -> str:
         """String representation.
@@ -234,12 +266,23 @@ class DockerVolumeBackupTask(AbstractBackupTask):
 class DockerMySQLBackupTask(AbstractBackupTask):
     target_dir_name: str = "mysql_databases"
 
-    def __init__(self, database: str, user: str, password: str, **kwargs: Dict):
+    def __init__(self, database: str, user: str, password: str, compress: bool = False, **kwargs: Dict):
+        """Constructor.
+
+        Args:
+            database (str): Name of the database to dump.
+            user (str): MySQL user to run mysqldump with.
+            password (str): Password of the MySQL user.
+            compress (bool, optional): Whether to gzip the dump ('.sql.gz'). Defaults to False.
+
+        Raises:
+            NotImplementedError: When unknown parameters are specified.
+        """
         self.database = database
         self.user = user
         self.password = password
+        self.compress = compress
 
-        self._docker_client = from_env()
         self._container_backup_bind_mount = Path("/backup")  # must be absolute!
 
         if kwargs:
@@ -258,6 +301,8 @@ class DockerMySQLBackupTask(AbstractBackupTask):
         The issued command to create the MySQL dump:
         Command: mysqldump --password=<root-pw> --user=root <database name> > /backup/<file>.sql
 
+        If 'compress' is set, the dump is gzip-compressed inside the container before it is copied ('.sql.gz').
+
         Folder structure after backup:
 
             |-mysql_databases
@@ -271,7 +316,8 @@ class DockerMySQLBackupTask(AbstractBackupTask):
         Returns:
             List[Path]: List of created files.
         """
-        if not container_exists(self._docker_client, service.container_name):
+        docker_client = get_docker_client()
+        if not container_exists(docker_client, service.container_name):
             raise BackupNotExistingContainerError(f"Container '{service.container_name}' does not exist.")
 
         backup_files: List[Path] = []
@@ -282,7 +328,7 @@ class DockerMySQLBackupTask(AbstractBackupTask):
             mysql_backup_item = self._create_mysql_backup_item(target_dir)
 
             backup_mapping = shell_backup(
-                self._docker_client,
+                docker_client,
                 "mysql:latest",
                 bind_mount_dir=tmp_dir,
                 container_to_backup=service.name,
@@ -312,9 +358,16 @@ class DockerMySQLBackupTask(AbstractBackupTask):
             mysql_backup_dir.mkdir(parents=True)
 
         container_filepath = self._container_backup_bind_mount.joinpath(filename)
+        command = f"mysqldump --password={self.password} --user={self.user} {self.database} > {container_filepath}"
+
+        if self.compress:
+            # no pipe: the exit code of mysqldump must be kept, 'docker exec' is retried until the server is up
+            command += f" && gzip {container_filepath}"
+            filename += ".gz"
+
         return BackupItem(
             command=None,  # make sure that MySQL main command is not overrideen
-            exec=f"mysqldump --password={self.password} --user={self.user} {self.database} > {container_filepath}",
+            exec=command,
             file_name=filename,
             final_path=mysql_backup_dir,
         )
@@ -323,7 +376,12 @@ class DockerMySQLBackupTask(AbstractBackupTask):
         if not isinstance(o, type(self)):
             return False
 
-        return self.database == o.database and self.user == o.user and self.password == o.password
+        return (
+            self.database == o.database
+            and self.user == o.user
+            and self.password == o.password
+            and self.compress == o.compress
+        )
 
     def __repr__(self) -> str:
-        return self.__class__.__qualname__ + f": {self.database}, {self.user}, {self.password}"
+        return self.__class__.__qualname__ + f": {self.database}, {self.user}, {self.password}, compress={self.compress}"
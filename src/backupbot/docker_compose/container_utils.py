@@ -3,36 +3,52 @@
 """Utility functions to integrate docker and docker-compose functionality."""
 
 import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from subprocess import CompletedProcess, run
-from typing import Dict, List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
+from uuid import uuid4
 
-from docker import DockerClient
+from docker import DockerClient, from_env
 from docker.errors import ContainerError
 
 from backupbot.logger import logger
 from backupbot.utils import timestamp
 
 
-@dataclass(unsafe_hash=True)
+@dataclass(frozen=True)
 class BackupItem:
-    # make sure this class is hashable so that it can be used as a dictionary key
+    # frozen, hence hashable so that it can be used as a dictionary key
     command: str = field(hash=False)
     file_name: str = field(hash=True)
     final_path: Path = field(hash=True)
     exec: Optional[str] = field(hash=False, default=None)
 
 
+@lru_cache(maxsize=1)
+def get_docker_client() -> DockerClient:
+    """Returns the docker client shared by all backup tasks and adapters of the process.
+
+    Creating a client connects to the docker daemon, hence it is only done once.
+
+    Returns:
+        DockerClient: Docker client created from the environment.
+    """
+    return from_env()
+
+
 @contextmanager
 def stop_and_restart_container(client: DockerClient, container_name: str, timeout: int = 20) -> None:
-    container_status = client.containers.get(container_name).status
+    container = client.containers.get(container_name)
+    container_status = container.status
 
     if container_status == "running":
-        client.containers.get(container_name).stop(timeout=timeout)
+        container.stop(timeout=timeout)
         yield None
-        client.containers.get(container_name).restart(timeout=timeout)
+        container.restart(timeout=timeout)
     else:
         raise RuntimeError(
             f"Container '{container_name}' must be runnung to be stopped and restarted, but is: '{container_status}'."
@@ -141,9 +157,12 @@ def shell_backup(
     The temporary container mounts 'bind_mount_dir'. Any files created by the command should be placed in
     'bind_mount_dir' where they can be used by the caller.
     When the backup item specifies a 'command' it is executed as the main command of the container. It therefore
-    replaces the container's main command.
+    replaces the container's main command. The commands of all such backup items are run one after another in a single
+    container, i.e. a failing command does not prevent the following ones from running. The file of a failing command
+    is removed so that the backup item is reported as failed, and the container exits with a non-zero code so that the
+    commands' error output is logged.
     When the backup item specifies an 'exec' command it is executed via 'docker exec' after the container has finished
-    its startign process.
+    its startign process. Every such backup item gets its own container.
 
     The function returns a dictionary which maps the backup item to its created file in the mounted directory
     ('bind_mount_dir').
@@ -169,23 +188,54 @@ def shell_backup(
     """
     backup_temporary_file_mapping: Dict[BackupItem, Union[Path, None]] = {}  # key: backup item; value: temporary file
 
-    for backup_item in backup_items:
-        name = f"{timestamp()}-backup-container"
+    batch = [backup_item for backup_item in backup_items if backup_item.exec is None]
+    if batch:
+        name = f"{timestamp()}-{container_to_backup}-backup-{uuid4().hex[:8]}"
+        failed = False
+        try:
+            docker_client.containers.run(
+                image=image,
+                name=name,
+                remove=True,
+                command=["sh", "-c", _batch_script(batch)],
+                volumes={str(bind_mount_dir): {"bind": str(Path("/backup"))}},
+                volumes_from=[container_to_backup],
+            )
+        except ContainerError as error:
+            stderr = error.stderr.decode(errors="replace") if isinstance(error.stderr, bytes) else error.stderr
+            logger.error(f"Backup commands in image '{image}' failed with exit code {error.exit_status}: {stderr}")
+            failed = True
+        finally:
+            try:
+                docker_client.containers.get(name).stop()
+            except Exception:
+                pass
+
+        for backup_item in batch:
+            mapping = bind_mount_dir.joinpath(backup_item.file_name)
+
+            if not mapping.exists():
+                if not failed:
+                    logger.error(f"Failed to backup item '{backup_item}': The backup command did not create a file.")
+                mapping = None
+
+            _add_mapping(backup_temporary_file_mapping, backup_item, mapping)
+
+    for backup_item in [backup_item for backup_item in backup_items if backup_item.exec is not None]:
+        name = f"{timestamp()}-{container_to_backup}-backup-{uuid4().hex[:8]}"
         try:
             container = docker_client.containers.run(
                 image=image,
                 name=name,
-                detach=backup_item.exec is not None,  # we need the container alive after the function returns
+                detach=True,  # we need the container alive after the function returns
                 remove=True,
                 command=backup_item.command,
                 volumes={str(bind_mount_dir): {"bind": str(Path("/backup"))}},
                 volumes_from=[container_to_backup],
             )
 
-            if backup_item.exec is not None:
-                # this means the container has not stopped yet
-                docker_exec_loop(name, command=backup_item.exec, timeout_s=timeout_s)
-                container.stop()
+            docker_exec_loop(name, command=backup_item.exec, timeout_s=timeout_s)
+            container.stop()
 
             mapping = bind_mount_dir.joinpath(backup_item.file_name)
 
@@ -204,17 +254,120 @@ def shell_backup(
             except Exception:
                 pass
 
-        if not backup_item.final_path in backup_temporary_file_mapping:
-            backup_temporary_file_mapping[backup_item] = mapping
-        else:
-            logger.error(
-                f"""Error while mapping backup item '{backup_item}' to temporary file '{mapping}': A"""
-                f""" mapping already exists for this backup item ('{backup_temporary_file_mapping[backup_item]}')."""
-            )
+        _add_mapping(backup_temporary_file_mapping, backup_item, mapping)
 
     return backup_temporary_file_mapping
 
 
+def _batch_script(backup_items: List[BackupItem]) -> str:
+    # commands of a batch share one container: every command runs even if a previous one failed, a failing command
+    # (e.g. tar) may still leave a truncated file behind which must not be taken for a backup, and the container's exit
+    # code reports whether any command failed
+    commands = [
+        f"{backup_item.command} || {{ rm -f /backup/{backup_item.file_name} ; rc=1 ; }}" for backup_item in backup_items
+    ]
+    return " ; ".join(["rc=0", *commands, "exit $rc"])
+
+
+def _add_mapping(
+    backup_temporary_file_mapping: Dict[BackupItem, Union[Path, None]], backup_item: BackupItem, mapping: Optional[Path]
+) -> None:
+    if backup_item not in backup_temporary_file_mapping:
+        backup_temporary_file_mapping[backup_item] = mapping
+    else:
+        logger.error(
+            f"""Error while mapping backup item '{backup_item}' to temporary file '{mapping}': A mapping already"""
+            f""" exists for this backup item ('{backup_temporary_file_mapping[backup_item]}')."""
+        )
+
+
+def stop_containers(
+    client: DockerClient,
+    container_names: List[str],
+    timeout: int = 10,
+    depends_on: Optional[Dict[str, List[str]]] = None,
+    stop_timeouts: Optional[Dict[str, int]] = None,
+) -> List[str]:
+    """Stops all running containers among the specified ones using the docker API.
+
+    Like 'docker-compose stop', containers are stopped before the containers they depend on. Containers which do not
+    depend on each other are stopped concurrently.
+
+    Args:
+        client (DockerClient): Docker client.
+        container_names (List[str]): Names of the containers to stop.
+        timeout (int, optional): Seconds to wait for a container to stop before killing it, unless 'stop_timeouts'
+            specifies it for the container. Defaults to 10.
+        depends_on (Optional[Dict[str, List[str]]], optional): Names of the containers each container depends on.
+            Defaults to None.
+        stop_timeouts (Optional[Dict[str, int]], optional): Seconds to wait per container, e.g. its
+            'stop_grace_period'. Defaults to None.
+
+    Returns:
+        List[str]: Names of the containers which have been stopped, i.e. which had been running.
+    """
+    names = set(container_names)
+    to_stop = {
+        container.name: container
+        for container in client.containers.list(filters={"status": "running"})
+        if container.name in names
+    }
+    stop_timeouts = stop_timeouts or {}
+
+    for level in reversed(_dependency_levels(list(to_stop), depends_on or {})):
+        # stopping waits up to the timeout per container, do it for all containers of a level at once
+        _run_concurrently(lambda name: to_stop[name].stop(timeout=stop_timeouts.get(name, timeout)), level)
+
+    return list(to_stop)
+
+
+def start_containers(
+    client: DockerClient, container_names: List[str], depends_on: Optional[Dict[str, List[str]]] = None
+) -> None:
+    """Starts the specified containers using the docker API.
+
+    Like 'docker-compose start', containers are started after the containers they depend on. Containers which do not
+    depend on each other are started concurrently.
+
+    Args:
+        client (DockerClient): Docker client.
+        container_names (List[str]): Names of the containers to start.
+        depends_on (Optional[Dict[str, List[str]]], optional): Names of the containers each container depends on.
+            Defaults to None.
+    """
+    for level in _dependency_levels(container_names, depends_on or {}):
+        _run_concurrently(lambda container_name: client.containers.get(container_name).start(), level)
+
+
+def _dependency_levels(container_names: List[str], depends_on: Dict[str, List[str]]) -> List[List[str]]:
+    # groups the containers so that each group only depends on the previous ones, dependencies on containers which are
+    # not among 'container_names' are ignored; docker-compose rejects cyclic dependencies, they end up in the last group
+    levels: List[List[str]] = []
+    remaining = list(container_names)
+    while remaining:
+        pending = set(remaining)
+        level = [
+            name for name in remaining if not any(dependency in pending for dependency in depends_on.get(name, []))
+        ]
+        if not level:
+            level = remaining
+        levels.append(level)
+        remaining = [name for name in remaining if name not in level]
+
+    return levels
+
+
+def _run_concurrently(function: Callable[[Any], Any], items: List[Any]) -> None:
+    # docker API calls mostly wait for the daemon, threads let them overlap
+    if len(items) <= 1:
+        for item in items:
+            function(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=len(items)) as executor:
+        list(executor.map(function, items))  # re-raises the first error
+
+
 def container_exists(client: DockerClient, container_name: str) -> bool:
     """Checks if a docker container has a valid state, e.g 'running' or 'stopped'.
 
@@ -13,3 +13,5 @@ class DockerComposeService(AbstractStorageInfo):
     hostname: str
     volumes: List[Volume]
     bind_mounts: List[HostDirectory]
+    depends_on: List[str] = []  # container names of the services this service depends on
+    stop_grace_period: int = 10  # seconds to wait for the container to stop before it is killed
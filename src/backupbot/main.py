@@ -5,15 +5,18 @@
 import sys
 from argparse import ArgumentParser
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 from backupbot.backupbot import BackupBot
 from backupbot.logger import logger
 
 
-def parse_args_backup() -> Tuple[str, Path, Path, Optional[Path]]:
+def parse_args_backup(argv: Optional[List[str]] = None) -> Tuple[str, Path, Path, Optional[Path]]:
     """Parses CLI parameters.
 
+    Args:
+        argv (Optional[List[str]], optional): CLI arguments. Defaults to None, in which case sys.argv is parsed.
+
     Returns:
         Tuple[str, Path, Path, Optional[Path]]: Adapter type, destination path instance, backup scheme config file path,
             source root directory.
@@ -25,7 +28,7 @@ def parse_args_backup() -> Tuple[str, Path, Path, Optional[Path]]:
     parser.add_argument("backup_config", help="Path to the backup scheme configuration file (.json).")
     parser.add_argument("-r", "--root", help="Path to service directory to backup.")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.root:
         args.root = Path(args.root)
@@ -33,7 +36,7 @@ def parse_args_backup() -> Tuple[str, Path, Path, Optional[Path]]:
     return args.adapter, Path(args.destination), Path(args.backup_config), args.root
 
 
-def parse_args_generate() -> Tuple[str, Path, Path, Optional[Path]]:
+def parse_args_generate(argv: Optional[List[str]] = None) -> Tuple[str, Path, Path, Optional[Path]]:
     parser = ArgumentParser()
 
     parser.add_argument("adapter", choices=["docker-compose"], help="Specifies the backup adapter to use.")
@@ -41,7 +44,7 @@ def parse_args_generate() -> Tuple[str, Path, Path, Optional[Path]]:
     parser.add_argument("-o", "--out-name", help="Backup configuration file name (must end with .json).")
     parser.add_argument("-d", "--out-directory", help="Target directory for the generated files.")
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if args.root:
         args.root = Path(args.root)
@@ -52,9 +55,13 @@ def parse_args_generate() -> Tuple[str, Path, Path, Optional[Path]]:
     return args.adapter, args.root, args.out_name, args.out_directory
 
 
-def main_backup() -> None:
-    """Main backup CLI entry point."""
-    adapter, destination_path, backup_config_path, root_path = parse_args_backup()
+def main_backup(argv: Optional[List[str]] = None) -> None:
+    """Main backup CLI entry point.
+
+    Args:
+        argv (Optional[List[str]], optional): CLI arguments. Defaults to None, in which case sys.argv is parsed.
+    """
+    adapter, destination_path, backup_config_path, root_path = parse_args_backup(argv)
 
     if root_path is None:
         root_path = Path.cwd()
@@ -75,9 +82,13 @@ def main_backup() -> None:
     sys.exit(0)
 
 
-def main_generate_config() -> None:
-    """Main CLI configuration template entry point."""
-    adapter, root_path, filename, target_dir = parse_args_generate()
+def main_generate_config(argv: Optional[List[str]] = None) -> None:
+    """Main CLI configuration template entry point.
+
+    Args:
+        argv (Optional[List[str]], optional): CLI arguments. Defaults to None, in which case sys.argv is parsed.
+    """
+    adapter, root_path, filename, target_dir = parse_args_generate(argv)
 
     if root_path is None:
         root_path = Path.cwd()
@@ -2,18 +2,36 @@
 
 """Backupbot utility functions."""
 
+import os
+import shutil
 import subprocess
+from copy import deepcopy
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from shutil import copyfile
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from yaml import Loader, load
+from yaml import load
+
+from backupbot.logger import logger
+
+try:
+    from yaml import CSafeLoader as Loader
+
+    LIBYAML_AVAILABLE = True
+except ImportError:
+    from yaml import SafeLoader as Loader
+
+    LIBYAML_AVAILABLE = False
 
 
 def match_files(root: Path, pattern: str, result: List[Path]) -> None:
     """Finds all files (recursively) that match the specified pattern.
 
+    Every directory is read once via os.scandir, Path objects are only created for matching files. Symbolic links to
+    directories are not followed.
+
     Args:
         root (Path): Directory to start search from.
         pattern (str): Pattern to match.
@@ -27,16 +45,16 @@ def match_files(root: Path, pattern: str, result: List[Path]) -> None:
             f"Unable to locate files matching pattern '{pattern}': Directory '{root}' does not exits."
         )
 
-    for file in [f for f in root.iterdir() if f.is_file()]:
-        if pattern in file.name:
-            result.append(file)
-
-    directories = [file for file in root.iterdir() if file.is_dir()]
-    if len(directories) == 0:
-        return
-
-    for dir in directories:
-        match_files(dir, pattern, result)
+    # every directory is visited once (directory symlinks are not followed), hence no file can be found twice and the
+    # result needs no de-duplication
+    directories = [os.fspath(root)]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif pattern in entry.name and entry.is_file():
+                    result.append(Path(entry.path))
 
 
 def load_yaml_file(path: Path) -> Dict:
@@ -51,15 +69,35 @@ def load_yaml_file(path: Path) -> Dict:
     Returns:
         Dict: Components of the docker-compose.yaml.
     """
-    if not path.exists():
-        raise FileNotFoundError(f"Unable to load Dockerfile '{path}': File does not extist.")
+    try:
+        stat = path.stat()
+    except FileNotFoundError as error:
+        raise FileNotFoundError(f"Unable to load Dockerfile '{path}': File does not extist.") from error
+
+    # the cached dictionary is shared, hand out copies so that callers cannot alter it
+    return deepcopy(_load_yaml_file_cached(os.fspath(path), stat.st_mtime_ns, stat.st_size))
+
 
-    with open(path.absolute(), "r") as file:
+@lru_cache(maxsize=128)
+def _load_yaml_file_cached(path: str, mtime_ns: int, size: int) -> Dict:
+    # mtime_ns and size are part of the cache key only, a modified file is parsed again (the size catches rewrites
+    # within the file system's timestamp granularity)
+    # hand the binary file object to the loader directly so that libyaml reads it in chunks
+    if not LIBYAML_AVAILABLE:
+        _warn_about_slow_yaml_loader()
+
+    with open(path, "rb") as file:
         content = load(file, Loader=Loader)
 
     return content
 
 
+@lru_cache(maxsize=1)
+def _warn_about_slow_yaml_loader() -> None:
+    # cached, hence the warning is only logged for the first parsed file
+    logger.warning("PyYAML was installed without libyaml bindings, falling back to the slow pure-Python YAML parser.")
+
+
 def get_volume_path(volume_string: str) -> str:
     """Returns the relative path of the volume or bind mount as it is specified in the compose file.
 
@@ -69,7 +107,7 @@ def get_volume_path(volume_string: str) -> str:
     Returns:
         str: Relative path of the volume.
     """
-    return volume_string.split(":")[0]
+    return volume_string.partition(":")[0]
 
 
 def absolute_path(relative_bind_mounts: List[str], root: Path) -> List[Path]:
@@ -85,9 +123,64 @@ def absolute_path(relative_bind_mounts: List[str], root: Path) -> List[Path]:
     return [root.joinpath(get_volume_path(relative_path)) for relative_path in relative_bind_mounts]
 
 
+# below this size the start-up cost of parallel compression outweighs its benefit
+PARALLEL_GZIP_MIN_BYTES = 1 << 20
+# tar record size in 512 byte blocks used when piping into pigz: 512KiB per write instead of the default 10KiB
+PARALLEL_GZIP_TAR_BLOCKING_FACTOR = 1024
+
+
+def size_exceeds(file_or_directory: Path, num_bytes: int) -> bool:
+    """Checks whether a file or directory (recursively) is at least 'num_bytes' large.
+
+    The directory tree is only traversed until the size is reached. Every directory is read once via os.scandir,
+    sub-directories are recognized from the cached directory entry type. Directories which cannot be read are skipped.
+
+    Args:
+        file_or_directory (Path): File or directory.
+        num_bytes (int): Size threshold in bytes.
+
+    Returns:
+        bool: True if the file or the files in the directory sum up to at least 'num_bytes'.
+    """
+    if not file_or_directory.is_dir():
+        return file_or_directory.stat().st_size >= num_bytes
+
+    total = 0
+    directories = [os.fspath(file_or_directory)]
+    while directories:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                        continue
+
+                    total += entry.stat(follow_symlinks=False).st_size
+                    if total >= num_bytes:
+                        return True
+        except OSError:
+            continue  # removed while traversing or not readable, like os.walk such directories are skipped
+
+    return False
+
+
+@lru_cache(maxsize=None)
+def parallel_gzip_program() -> Optional[str]:
+    """Looks up 'pigz', a parallel implementation of gzip, on the host (once per process).
+
+    Returns:
+        Optional[str]: Path to the 'pigz' executable or None if it is not installed.
+    """
+    return shutil.which("pigz")
+
+
 def tar_file_or_directory(file_or_directory: Path, tar_name: str, destination: Path, override: bool = False) -> Path:
     """Tar-compresses the specified file or directory.
 
+    Compression uses all cores via 'pigz' if it is installed and the data is at least PARALLEL_GZIP_MIN_BYTES large,
+    'gzip' is used otherwise. Both create the same file format. Tar writes to 'pigz' in large records to reduce the
+    number of pipe writes.
+
     Args:
         directory (Path): The file or directory to tar-compress.
         tar_name (str): Target name of the tar file.
@@ -116,9 +209,39 @@ def tar_file_or_directory(file_or_directory: Path, tar_name: str, destination: P
             match_files(destination, bare_name, existing_files)
             tar_file_path = destination.joinpath(f"{tar_name}({len(existing_files) - 1}).tar.gz")
 
-    cmd_args = ("tar", "-czf", tar_file_path.absolute(), file_or_directory.absolute())
+    # absolute paths, tar stores the members under the source's absolute path (without the leading '/')
+    source, target = os.fspath(file_or_directory.absolute()), os.fspath(tar_file_path.absolute())
+
+    pigz = parallel_gzip_program()
+    use_pigz = False
+    if pigz is not None:
+        try:
+            use_pigz = size_exceeds(file_or_directory, PARALLEL_GZIP_MIN_BYTES)
+        except OSError:
+            pass  # the size probe is only an optimization, tar reports unreadable data itself
+
+    if not use_pigz:
+        cmd_args = ("tar", "-czf", target, source)
+    else:
+        cmd_args = (
+            "tar",
+            "-b",
+            str(PARALLEL_GZIP_TAR_BLOCKING_FACTOR),
+            "-I",
+            pigz,
+            "-cf",
+            target,
+            source,
+        )
 
-    proc_return: subprocess.CompletedProcess = subprocess.run(cmd_args)
+    proc_return: subprocess.CompletedProcess = subprocess.run(
+        cmd_args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
 
     if proc_return.returncode != 0:
         raise RuntimeError(f"'tar' exited with an error: '{proc_return.stderr}'.")
@@ -129,9 +252,12 @@ def tar_file_or_directory(file_or_directory: Path, tar_name: str, destination: P
     return tar_file_path
 
 
+@lru_cache(maxsize=4096)
 def path_to_string(directory: Path, num_steps: int = -1, delim: str = "-") -> str:
     """Creates a string from the specied path. Path delimiters '/' are replaced by the specified delimiter.
 
+    Results are memoized, the same bind mount paths are converted repeatedly during a backup.
+
     Args:
         directory (Path): Path instance.
         num_steps (int, optional): Specifies how many components of the path are considered, starting from the back.
@@ -141,19 +267,22 @@ def path_to_string(directory: Path, num_steps: int = -1, delim: str = "-") -> st
     Returns:
         str: String version of the path.
     """
-    path_components = str(directory).split("/")
-    if path_components[0] == "":
+    path_components = directory.parts
+    if path_components and path_components[0] == directory.anchor:
         path_components = path_components[1:]
 
     if num_steps == -1:
         return delim.join(path_components)
 
-    start = len(path_components) - num_steps
-    return delim.join(path_components[start:])
+    return delim.join(path_components[len(path_components) - num_steps :])
+
+
+# time.strftime() does not support microseconds ('%f'), hence datetime is used
+TIMESTAMP_FORMAT = "%y-%m-%d-%H-%M-%S-%f"
 
 
 def timestamp() -> str:
-    return datetime.now().strftime("%y-%m-%d-%H-%M-%S-%f")
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
 
 
 def copy_files(dest_source_mapping: Dict[Path, Path]) -> None:
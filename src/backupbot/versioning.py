@@ -2,13 +2,18 @@
 
 """File versioning module."""
 
+import os
 import re
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Pattern, Tuple, Union
+from typing import List, Optional, Pattern, Tuple, Union
 
 from backupbot.data_structures import FileVersion
+from backupbot.logger import logger
 
-VERSIONING_TO_PATTERN = {"d-d": re.compile("\d-\d\.")}
+VERSIONING_TO_PATTERN = {"d-d": re.compile(r"(\d)-(\d)\.")}
+# temporary name of a file between the two rename passes of update_version_numbers: '.<name>.<index>.tmp'
+STAGED_FILE_PATTERN = re.compile(r"\.(?P<name>.+)\.(?P<index>\d+)\.tmp")
 
 
 def update_version_numbers(
@@ -38,20 +43,79 @@ def update_version_numbers(
     if not directory.is_dir():
         raise NotADirectoryError(f"Error updating file versions in '{directory}': Folder does not exist.")
 
-    files: List[Path] = [file for file in directory.iterdir() if file.is_file() and file.name.endswith(file_ending)]
-    old_new_pairs: List[Tuple[Path, Path]] = create_target_names(files, file_ending, version_pattern, major)
+    restore_staged_files(directory, file_ending)
+
+    with os.scandir(directory) as entries:
+        files_ctime: List[Tuple[Path, float]] = [
+            (Path(entry.path), entry.stat(follow_symlinks=False).st_ctime)
+            for entry in entries
+            if entry.is_file(follow_symlinks=False) and entry.name.endswith(file_ending)
+        ]
+    files_ctime.sort(key=itemgetter(1))  # sort from oldest to newest
+
+    files: List[Path] = [file for file, _ in files_ctime]
+    old_new_pairs: List[Tuple[Path, Path]] = create_target_names(
+        files, file_ending, version_pattern, major, presorted=True
+    )
+
+    # rename in two passes via temporary names so that a target name still held by another file is never overwritten,
+    # the temporary names do not end with the file ending, an interrupted run is undone by restore_staged_files
+    staged: List[Tuple[str, str]] = []
+    for index, (old_file, new_file) in enumerate(old_new_pairs):
+        if old_file == new_file:
+            continue
+        temporary_file = old_file.with_name(f".{old_file.name}.{index}.tmp")
+        os.replace(old_file, temporary_file)
+        staged.append((os.fspath(temporary_file), os.fspath(new_file)))
 
-    for old_file, new_file in old_new_pairs:
-        old_file.rename(new_file)
+    for temporary_file, new_file in staged:
+        os.replace(temporary_file, new_file)
 
     return old_new_pairs
 
 
+def restore_staged_files(directory: Path, file_ending: str) -> List[Path]:
+    """Renames files left behind by an interrupted update_version_numbers call back to their original names.
+
+    The files are restored in the order in which they were staged (oldest first) so that their creation times keep the
+    versions' order.
+
+    Args:
+        directory (Path): The files' parent directory.
+        file_ending (str): File type.
+
+    Returns:
+        List[Path]: Restored files.
+    """
+    with os.scandir(directory) as entries:
+        staged: List[Tuple[int, str, str]] = []
+        for entry in entries:
+            match = STAGED_FILE_PATTERN.fullmatch(entry.name)
+            if match and match["name"].endswith(file_ending) and entry.is_file(follow_symlinks=False):
+                staged.append((int(match["index"]), entry.path, match["name"]))
+
+    restored: List[Path] = []
+    for _, temporary_file, name in sorted(staged):
+        original_file = directory.joinpath(name)
+        if original_file.exists():
+            logger.error(f"Unable to restore '{temporary_file}': File '{original_file}' already exists.")
+            continue
+
+        os.replace(temporary_file, original_file)
+        restored.append(original_file)
+
+    if restored:
+        logger.warning(f"Restored {len(restored)} file(s) of an interrupted versioning run in '{directory}'.")
+
+    return restored
+
+
 def create_target_names(
     files: List[Path],
     file_ending: str,
     version_pattern: Pattern[str] = VERSIONING_TO_PATTERN["d-d"],
     major: bool = False,
+    presorted: bool = False,
 ) -> List[Tuple[Path, Path]]:
     """Creates a path with an updated version number if necessary for each file in the list.
 
@@ -67,6 +131,8 @@ def create_target_names(
         file_ending (str): File type.
         version_pattern (Pattern[str], optional): Version regex pattern. Defaults to VERSIONING_TO_PATTERN["d-d"].
         major (bool, optional): Whether to update the major or minor version. Defaults to False.
+        presorted (bool, optional): Whether the files are already sorted from oldest to newest, which skips sorting
+            them by creation time. Defaults to False.
 
     Returns:
         List[Tuple[Path, Path]]: Pairs of old and new paths.
@@ -75,7 +141,8 @@ def create_target_names(
     if num_files == 0:
         return []
 
-    files = sorted(files, key=lambda x: x.lstat().st_ctime)  # sort from oldest to newest
+    if not presorted:
+        files = sorted(files, key=lambda x: x.lstat().st_ctime)  # sort from oldest to newest
     version = get_max_version_number(files)
 
     if version is None:
@@ -90,11 +157,11 @@ def create_target_names(
     for i in range(num_files):
         file = files[i]
 
-        if not re.search(version_pattern, file.name):
+        # a single pass of the precompiled pattern both detects and replaces an existing version number
+        updated_name, num_versions = version_pattern.subn(f"{version.major}-{version.minor}.", file.name)
+        if num_versions == 0:
             # this must be a newly created file without version number
             updated_name = file.name.replace(f".{file_ending}", f"-{version.major}-{version.minor}.{file_ending}")
-        else:
-            updated_name = re.sub(version_pattern, f"{version.major}-{version.minor}.", file.name)
 
         old_new_pairs.append((file, file.parent.joinpath(updated_name)))
 
@@ -119,21 +186,11 @@ def get_max_version_number(
     Returns:
         Union[FileVersion, None]: File version or None if none could be found.
     """
-    max = None
-    for file in files:
-        version = get_file_version(file.name, version_pattern)
-
-        if version is None:
-            continue
+    # reduce plain (major, minor) tuples, only the maximum becomes a FileVersion
+    versions = (_parse_version(file.name, version_pattern) for file in files)
+    max_version = max((version for version in versions if version is not None), default=None)
 
-        if max is None:
-            max = version
-            continue
-
-        if version > max:
-            max = version
-
-    return max
+    return None if max_version is None else FileVersion(*max_version)
 
 
 def get_file_version(
@@ -155,13 +212,18 @@ def get_file_version(
     Returns:
         Union[FileVersion, None]: File version or None.
     """
+    version = _parse_version(file_name, version_pattern)
+
+    return None if version is None else FileVersion(*version)
+
+
+def _parse_version(file_name: str, version_pattern: Pattern[str]) -> Optional[Tuple[int, int]]:
     if version_pattern == VERSIONING_TO_PATTERN["d-d"]:
-        matches = re.findall(version_pattern, file_name)
+        matches = version_pattern.findall(file_name)
         if not matches:
             return None
-        version_string: str = matches[::-1][0]  # last match
-        major_minor = [character for character in version_string if character.isnumeric()]
+        major, minor = matches[-1]  # last match
 
-        return FileVersion(int(major_minor[0]), int(major_minor[1]))
+        return int(major), int(minor)
 
     raise NotImplementedError(f"Unknown version pattern: '{version_pattern}'.")
@@ -2,20 +2,83 @@
 
 """Testing fixtures."""
 
+import os
+import tarfile
 from contextlib import contextmanager
-from email.generator import Generator
 from pathlib import Path
-from typing import Callable
+from shutil import copyfile
+from threading import Lock
+from typing import Callable, Dict, Generator, List, Set
 
 import pytest
 from docker import DockerClient, from_env
-from docker.errors import NotFound
+from docker.errors import DockerException, ImageNotFound
 
 from backupbot.docker_compose.container_utils import (
     docker_compose_down,
     docker_compose_up,
     docker_exec,
 )
+from backupbot.utils import load_yaml_file
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--fork-docker-tests",
+        action="store_true",
+        default=False,
+        help="Run each docker test in a forked subprocess (requires pytest-forked).",
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config: pytest.Config) -> None:
+    """Places pytest's temporary directories on tmpfs ('/dev/shm') if available.
+
+    Most backup tests write tar archives into 'tmp_path', keeping them in memory avoids disk syncs. Only the temp root
+    is changed, pytest still creates its numbered, per-user run directories below it, so concurrent runs do not
+    interfere. An explicit '--basetemp' or 'PYTEST_DEBUG_TEMPROOT' always takes precedence.
+    """
+    shm = Path("/dev/shm")
+    if config.option.basetemp is None and shm.is_dir() and os.access(shm, os.W_OK):
+        os.environ.setdefault("PYTEST_DEBUG_TEMPROOT", str(shm))
+
+
+def _docker_available() -> bool:
+    """Checks whether the docker daemon can be reached.
+
+    Returns:
+        bool: True if the daemon answers a ping.
+    """
+    try:
+        return from_env(timeout=5).ping()
+    except DockerException:
+        return False
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: List[pytest.Item]) -> None:
+    """Groups all docker tests so that pytest-xdist runs them on the same worker.
+
+    Docker tests share container names (e.g. 'bind_mount_service') and must therefore never run concurrently.
+    With '--fork-docker-tests' each docker test additionally runs in a forked subprocess so that a crashing test cannot
+    abort the whole run. Unit tests never pay for the fork. Note that session-scoped fixtures are set up and torn down
+    per forked test, i.e. the docker-compose project is no longer shared across docker tests in this mode.
+
+    If the docker daemon is not reachable, docker tests are skipped instead of failing one by one.
+    """
+    docker_items = [item for item in items if "docker" in item.keywords]
+    if not docker_items:
+        return
+
+    fork_docker_tests = config.getoption("--fork-docker-tests")
+    skip_docker = None if _docker_available() else pytest.mark.skip(reason="docker daemon is not available")
+
+    for item in docker_items:
+        item.add_marker(pytest.mark.xdist_group("docker"))
+        if fork_docker_tests:
+            item.add_marker(pytest.mark.forked)
+        if skip_docker is not None:
+            item.add_marker(skip_docker)
 
 
 @pytest.fixture
@@ -23,7 +86,7 @@ def resources_dir() -> Path:
     return Path(__file__).parent.joinpath("resources")
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def dummy_docker_compose_file() -> Path:
     """Returns the path to the dummy Dockerfile located in /tests/utils.
 
@@ -33,6 +96,18 @@ def dummy_docker_compose_file() -> Path:
     return Path(__file__).parent.joinpath("resources", "docker-compose.yaml")
 
 
+@pytest.fixture(scope="session")
+def parsed_dummy_docker_compose_file(dummy_docker_compose_file: Path) -> Dict:
+    """Returns the content of the dummy Dockerfile, parsed once per test session.
+
+    Tests which modify the content must work on a copy.
+
+    Returns:
+        Dict: Parsed docker-compose file.
+    """
+    return load_yaml_file(dummy_docker_compose_file)
+
+
 @pytest.fixture
 def dummy_backup_scheme_file() -> Path:
     """Returns the path to the dummy Dockerfile located in /tests/utils.
@@ -53,6 +128,42 @@ def dummy_bind_mount_dir() -> Path:
     return Path(__file__).parent.joinpath("resources", "sample_bind_mount_dir")
 
 
+@pytest.fixture(scope="session")
+def cached_tar_file_or_directory(tmp_path_factory: pytest.TempPathFactory) -> Callable[..., Path]:
+    """Returns a drop-in replacement for 'tar_file_or_directory' which compresses every source only once per session.
+
+    Test resources never change during a test session, so the first archive created for a source is cached and later
+    calls merely copy it to the requested destination. Archives are written in-process with the fastest gzip level
+    instead of calling 'tar'. Use it via monkeypatch in tests which only check that archives are created, tests of
+    'tar_file_or_directory' itself must use the real function. Existing archives in the destination are always
+    overridden.
+
+    Returns:
+        Callable[..., Path]: Function with the signature of 'tar_file_or_directory'.
+    """
+    cache_dir = tmp_path_factory.mktemp("tar_cache")
+    cache: Dict[Path, Path] = {}
+    lock = Lock()  # the bind mount backup task calls the function from multiple threads
+
+    def func(file_or_directory: Path, tar_name: str, destination: Path, override: bool = False) -> Path:
+        if not destination.exists():
+            raise NotADirectoryError(f"Target directory does not exist: '{destination}'.")
+
+        with lock:
+            if file_or_directory not in cache:
+                if not file_or_directory.exists():
+                    raise NotADirectoryError(f"Directory to compress does not exist: '{file_or_directory}'.")
+
+                tar_file_path = cache_dir.joinpath(f"{len(cache)}.tar.gz")
+                with tarfile.open(tar_file_path, "w:gz", compresslevel=1) as tar:
+                    tar.add(file_or_directory)
+                cache[file_or_directory] = tar_file_path
+
+        return Path(copyfile(cache[file_or_directory], destination.joinpath(f"{tar_name}.tar.gz")))
+
+    return func
+
+
 @pytest.fixture(scope="session")
 def docker_client() -> DockerClient:
     """Returns the host's docker client.
@@ -74,17 +185,48 @@ def sample_docker_compose_project_dir() -> Path:
     return Path(__file__).parent.joinpath("resources", "sample_docker_compose_service")
 
 
-@pytest.fixture
-def running_docker_compose_project() -> Callable:
-    """Returns a callable which can be used to start a docker-compose project.
+@pytest.fixture(scope="session")
+def docker_images(docker_client: DockerClient) -> List[str]:
+    """Makes sure that the images used by the sample docker-compose project, the backup tasks and the container tests
+    exist locally.
+
+    Missing images are pulled once per test session, so that no docker test pays for the download.
 
     Returns:
-        Callable: Callable function.
+        List[str]: Image references.
+    """
+    images = ["ubuntu:latest", "mysql:latest", "busybox:latest"]
+
+    for image in images:
+        try:
+            docker_client.images.get(image)
+        except ImageNotFound:
+            docker_client.images.pull(image)
+
+    return images
+
+
+@pytest.fixture(scope="session")
+def running_docker_compose_project(
+    docker_client: DockerClient, docker_images: List[str]
+) -> Generator[Callable, None, None]:
+    """Returns a callable which can be used to start a docker-compose project.
+
+    The fixture is session-scoped: a project is started on first use and only shut down at the end of the test session,
+    so that container start-up is paid once instead of once per test.
+
+    Yields:
+        Generator[Callable, None, None]: Callable function.
     """
+    started: Set[Path] = set()
 
     @contextmanager
     def func(compose_file: Path) -> Generator:
-        """Provides a the specified docker compose context and shuts it down if necessary after the test.
+        """Provides the specified docker compose context.
+
+        'docker-compose up' is issued to (re-)start containers that a previous test stopped or removed. It is skipped if
+        all containers of the project are running already, which is checked with a single docker API call. Services
+        without a fixed 'container_name' are always (re-)started.
 
         Args:
             compose_file (Path): Path to the docker-compose file.
@@ -92,38 +234,21 @@ def running_docker_compose_project() -> Callable:
         Yields:
             Generator: Yields None.
         """
-        docker_compose_up(compose_file)
-        try:
-            yield None
-        finally:
-            docker_compose_down(compose_file)
-
-    return func
-
+        services = load_yaml_file(compose_file)["services"].values()
+        container_names = {service.get("container_name") for service in services}
 
-@pytest.fixture(scope="function")
-@contextmanager
-def running_sleeping_ubuntu() -> str:
-    client = from_env()
-
-    container_name = "sleeping_container"
+        running = {
+            container.name
+            for container in docker_client.containers.list(filters={"name": list(container_names - {None})})
+            if container.status == "running"
+        }
+        if not container_names <= running:  # always true for services without 'container_name'
+            docker_compose_up(compose_file)
 
-    try:
-        client.containers.get(container_name)
-        if client.containers.get(container_name).status == "exited":
-            # else container is running
-            client.containers.get(container_name).restart()
-    except NotFound:
-        # if the container name does not exist start a new container
-        client.containers.run("ubuntu:latest", "sleep_infinity", name=container_name, detach=True)
+        started.add(compose_file)
+        yield None
 
-    # if client.containers.get(container_name).status == "running":
-    yield container_name
+    yield func
 
-    try:
-        if client.containers.get(container_name).status == "running":
-            client.containers.get(container_name).stop()
-        client.containers.get(container_name).remove()
-    except:
-        # container does not exist anymore
-        pass
+    for compose_file in started:
+        docker_compose_down(compose_file)
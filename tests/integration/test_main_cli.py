@@ -1,10 +1,14 @@
-import os
 import sys
+from logging import INFO
 from pathlib import Path
 from subprocess import CompletedProcess, run
 from typing import Callable
 
 import pytest
+from pytest import LogCaptureFixture
+
+from backupbot.main import main_backup, main_generate_config
+from tests.utils.file_system import count_entries
 
 
 @pytest.mark.docker
@@ -12,50 +16,49 @@ def test_backupbot_backup(
     tmp_path: Path,
     running_docker_compose_project: Callable,
     sample_docker_compose_project_dir: Path,
+    caplog: LogCaptureFixture,
 ) -> None:
     backup_config = sample_docker_compose_project_dir.joinpath("combined_backup_scheme.json")
     compose_file = sample_docker_compose_project_dir.joinpath("docker-compose.yaml")
 
-    env = os.environ.copy()
-
-    args = (
-        "backupbot",
+    argv = [
         "-r",
-        sample_docker_compose_project_dir.absolute(),
+        str(sample_docker_compose_project_dir.absolute()),
         "docker-compose",
-        tmp_path.absolute(),
-        backup_config.absolute(),
-    )
+        str(tmp_path.absolute()),
+        str(backup_config.absolute()),
+    ]
 
     with running_docker_compose_project(compose_file) as _:
-        proc: CompletedProcess = run(args, capture_output=True, env=env)
+        with pytest.raises(SystemExit) as exit_info:
+            main_backup(argv)
 
-    assert proc.returncode == 0
-    assert "Exited with success." in str(proc.stdout)
+    assert exit_info.value.code == 0
+    assert ("backupbot.logger", INFO, "Exited with success.") in caplog.record_tuples
 
     bind_mount_dir = tmp_path.joinpath("bind_mount_service", "bind_mounts", "bind_mount")
     assert bind_mount_dir.is_dir()
-    assert len(list(bind_mount_dir.iterdir())) == 1  # one backup file
+    assert count_entries(bind_mount_dir) == 1  # one backup file
 
     volume_dir = tmp_path.joinpath("volume_service", "volumes", "test_volume")
     assert volume_dir.is_dir()
-    assert len(list(volume_dir.iterdir())) == 1  # one backup file
+    assert count_entries(volume_dir) == 1  # one backup file
 
     mysql_dir = tmp_path.joinpath("mysql_service", "mysql_databases", "test_database")
     assert mysql_dir.is_dir()
-    assert len(list(mysql_dir.iterdir())) == 1
+    assert count_entries(mysql_dir) == 1
 
 
+@pytest.mark.docker
 def test_bub_backup(
     tmp_path: Path,
     running_docker_compose_project: Callable,
     sample_docker_compose_project_dir: Path,
 ) -> None:
+    # smoke test for the console script wiring, all other CLI tests call the entry points in-process
     backup_config = sample_docker_compose_project_dir.joinpath("combined_backup_scheme.json")
     compose_file = sample_docker_compose_project_dir.joinpath("docker-compose.yaml")
 
-    env = os.environ.copy()
-
     args = (
         "bub",
         "-r",
@@ -66,31 +69,32 @@ def test_bub_backup(
     )
 
     with running_docker_compose_project(compose_file) as _:
-        proc: CompletedProcess = run(args, capture_output=True, env=env)
+        proc: CompletedProcess = run(args, capture_output=True)
 
     assert proc.returncode == 0
     assert "Exited with success." in str(proc.stdout)
 
 
-def test_backupbot_confgen(tmp_path: Path, sample_docker_compose_project_dir: Path) -> None:
-    args = (
-        "backupbot-confgen",
+def test_backupbot_confgen(tmp_path: Path, sample_docker_compose_project_dir: Path, caplog: LogCaptureFixture) -> None:
+    argv = [
         "-r",
-        sample_docker_compose_project_dir,
+        str(sample_docker_compose_project_dir),
         "-o",
         "backup-conf.json",
         "-d",
-        tmp_path,
+        str(tmp_path),
         "docker-compose",
-    )
+    ]
 
-    proc: CompletedProcess = run(args, capture_output=True, env=os.environ.copy())
+    with pytest.raises(SystemExit) as exit_info:
+        main_generate_config(argv)
 
-    assert proc.returncode == 0
-    assert "Exited with success." in str(proc.stdout)
+    assert exit_info.value.code == 0
+    assert ("backupbot.logger", INFO, "Exited with success.") in caplog.record_tuples
 
 
 def test_bub_confgen(tmp_path: Path, sample_docker_compose_project_dir: Path) -> None:
+    # smoke test for the console script wiring, all other CLI tests call the entry points in-process
     args = (
         "bub-confgen",
         "-r",
@@ -102,7 +106,8 @@ def test_bub_confgen(tmp_path: Path, sample_docker_compose_project_dir: Path) ->
         "docker-compose",
     )
 
-    proc: CompletedProcess = run(args, capture_output=True, env=os.environ.copy())
+    proc: CompletedProcess = run(args, capture_output=True)
 
     assert proc.returncode == 0
     assert "Exited with success." in str(proc.stdout)
+    assert tmp_path.joinpath("backup-conf.json").is_file()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+"""Testing fixtures for docker-compose tests."""
+
+from copy import deepcopy
+from typing import Dict, Generator, List
+
+import pytest
+from docker import DockerClient
+from docker.models.containers import Container
+from pytest import MonkeyPatch
+
+import backupbot.docker_compose.backup
+import backupbot.docker_compose.backup_tasks
+from backupbot.docker_compose.backup import DockerComposeBackupAdapter
+
+
+@pytest.fixture(autouse=True)
+def frozen_timestamp(monkeypatch: MonkeyPatch) -> None:
+    """Replaces the backup tasks' timestamp with 'TIMESTAMP' so that backup file names are predictable."""
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", lambda *_: "TIMESTAMP")
+
+
+@pytest.fixture
+def dba() -> DockerComposeBackupAdapter:
+    """Returns a fresh docker-compose backup adapter for each test.
+
+    Returns:
+        DockerComposeBackupAdapter: Backup adapter instance.
+    """
+    return DockerComposeBackupAdapter()
+
+
+@pytest.fixture
+def compose_dict(parsed_dummy_docker_compose_file: Dict) -> Dict:
+    """Returns the parsed content of the dummy docker-compose file without reading it from disk.
+
+    Tests which exercise the parser logic rather than YAML loading should monkeypatch 'load_yaml_file' to return it.
+
+    Returns:
+        Dict: Copy of the parsed docker-compose file which may be modified by the test.
+    """
+    return deepcopy(parsed_dummy_docker_compose_file)
+
+
+@pytest.fixture
+def preloaded_compose_file(compose_dict: Dict, monkeypatch: MonkeyPatch) -> Dict:
+    """Makes the docker-compose backup adapter load the parsed dummy docker-compose file instead of reading any file.
+
+    Like 'load_yaml_file', every call returns a fresh copy.
+
+    Returns:
+        Dict: Parsed docker-compose file.
+    """
+    monkeypatch.setattr(backupbot.docker_compose.backup, "load_yaml_file", lambda *_, **__: deepcopy(compose_dict))
+    return compose_dict
+
+
+@pytest.fixture(scope="module")
+def sleeping_container(docker_client: DockerClient, docker_images: List[str]) -> Generator[Container, None, None]:
+    """Runs a sleeping busybox container which is shared by all tests of a module and removed afterwards.
+
+    Tests which stop the container must start it again so that the next test finds it running.
+
+    Yields:
+        Generator[Container, None, None]: Running container named 'sleeping_busybox'.
+    """
+    container = docker_client.containers.run(
+        "busybox:latest", ["sleep", "infinity"], name="sleeping_busybox", detach=True
+    )
+
+    yield container
+
+    container.remove(force=True)
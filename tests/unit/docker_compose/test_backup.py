@@ -1,6 +1,6 @@
 from pathlib import Path
-from typing import Callable, List
-from unicodedata import bidirectional
+from typing import Callable, Dict, List
+from unittest.mock import MagicMock
 
 import pytest
 from docker import DockerClient
@@ -14,7 +14,9 @@ from backupbot.docker_compose.backup_tasks import (
     DockerMySQLBackupTask,
     DockerVolumeBackupTask,
 )
+from backupbot.docker_compose.container_utils import docker_compose_stop
 from backupbot.docker_compose.storage_info import DockerComposeService
+from tests.utils.file_system import make_tree
 
 test_system_storage_info = {
     "bind_mount_service": DockerComposeService(
@@ -44,34 +46,36 @@ test_system_storage_info = {
 }
 
 
-def test_docker_backup_adapter_discover_config_files(tmp_path: Path) -> None:
-    tmp_path.joinpath("services", "data").mkdir(parents=True)
-    tmp_path.joinpath("services", "other_data", "more_data").mkdir(parents=True)
+def test_docker_backup_adapter_discover_config_files(dba: DockerComposeBackupAdapter, tmp_path: Path) -> None:
+    make_tree(tmp_path, "services/data/", "services/other_data/more_data/docker-compose.yaml")
 
-    tmp_path.joinpath("services", "other_data", "more_data", "docker-compose.yaml").touch()
+    files = dba.discover_config_files(tmp_path)
+
+    found = set(files)
+    assert found == {tmp_path.joinpath("services", "other_data", "more_data", "docker-compose.yaml")}
+    assert len(files) == len(found)
 
-    dba = DockerComposeBackupAdapter()
+
+def test_docker_backup_adapter_discover_config_files_prefers_compose_file_in_root(
+    dba: DockerComposeBackupAdapter, tmp_path: Path
+) -> None:
+    make_tree(tmp_path, "docker-compose.yaml", "bind_mount/other_project/docker-compose.yaml")
 
     files = dba.discover_config_files(tmp_path)
 
-    assert not set(files).difference(
-        [
-            tmp_path.joinpath("services", "other_data", "more_data", "docker-compose.yaml"),
-        ]
-    )
-    assert len(files) == len(set(files))
+    assert files == [tmp_path.joinpath("docker-compose.yaml")]
 
 
 def test_docker_backup_adapter_discover_config_files_raises_error_when_more_or_less_than_one_config_file_found(
+    dba: DockerComposeBackupAdapter,
     tmp_path: Path,
 ) -> None:
-    tmp_path.joinpath("zero_files", "data").mkdir(parents=True)
-    tmp_path.joinpath("two_files", "data", "more_data").mkdir(parents=True)
-
-    tmp_path.joinpath("two_files", "data", "docker-compose.yaml").touch()
-    tmp_path.joinpath("two_files", "data", "more_data", "docker-compose.yaml").touch()
-
-    dba = DockerComposeBackupAdapter()
+    make_tree(
+        tmp_path,
+        "zero_files/data/",
+        "two_files/data/docker-compose.yaml",
+        "two_files/data/more_data/docker-compose.yaml",
+    )
 
     with pytest.raises(RuntimeError):
         dba.discover_config_files(tmp_path.joinpath("zero_files"))
@@ -81,10 +85,11 @@ def test_docker_backup_adapter_discover_config_files_raises_error_when_more_or_l
 
 
 def test_docker_backup_adapter__parse_compose_file_parses_docker_compose_file_correctly(
-    tmp_path: Path, dummy_docker_compose_file: Path
+    dba: DockerComposeBackupAdapter,
+    tmp_path: Path,
+    dummy_docker_compose_file: Path,
+    preloaded_compose_file: Dict,
 ) -> None:
-    dba = DockerComposeBackupAdapter()
-
     parsed = dba._parse_compose_file(file=dummy_docker_compose_file, root_directory=tmp_path)
     compare = {
         "service1": DockerComposeService(
@@ -125,9 +130,24 @@ def test_docker_backup_adapter__parse_compose_file_parses_docker_compose_file_co
     assert parsed == compare
 
 
-def test_docker_backup_adapter_parse_backup_scheme(dummy_backup_scheme_file: Path) -> None:
-    dba = DockerComposeBackupAdapter()
+def test_docker_backup_adapter__parse_compose_file_parses_dependencies_and_stop_grace_period(
+    dba: DockerComposeBackupAdapter, tmp_path: Path, dummy_docker_compose_file: Path, preloaded_compose_file: Dict
+) -> None:
+    preloaded_compose_file["services"]["first_service"]["depends_on"] = ["second_service"]
+    preloaded_compose_file["services"]["first_service"]["stop_grace_period"] = "1m30s"
+    preloaded_compose_file["services"]["second_service"]["depends_on"] = {"first_service": {"condition": "healthy"}}
+
+    parsed = dba._parse_compose_file(file=dummy_docker_compose_file, root_directory=tmp_path)
+
+    assert parsed["service1"].depends_on == ["service2"]
+    assert parsed["service1"].stop_grace_period == 90
+    assert parsed["service2"].depends_on == ["service1"]
+    assert parsed["service2"].stop_grace_period == 10
+
 
+def test_docker_backup_adapter_parse_backup_scheme(
+    dba: DockerComposeBackupAdapter, dummy_backup_scheme_file: Path
+) -> None:
     assert dba.parse_backup_scheme(dummy_backup_scheme_file) == {
         "service1": [
             DockerBindMountBackupTask(["all"]),
@@ -139,19 +159,17 @@ def test_docker_backup_adapter_parse_backup_scheme(dummy_backup_scheme_file: Pat
 
 
 def test_docker_backup__parse_compose_file_raises_error_if_no_services_key_in_file(
-    tmp_path: Path, monkeypatch: MonkeyPatch
+    dba: DockerComposeBackupAdapter, tmp_path: Path, monkeypatch: MonkeyPatch
 ) -> None:
-    dba = DockerComposeBackupAdapter()
-
     monkeypatch.setattr(backupbot.docker_compose.backup, "load_yaml_file", lambda *_, **__: {})
 
     with pytest.raises(RuntimeError):
         dba._parse_compose_file(None, tmp_path)  # type: ignore
 
 
-def test_docker_backup_parse_backup_scheme_raises_error_for_wrong_file_type(tmp_path: Path) -> None:
-    dba = DockerComposeBackupAdapter()
-
+def test_docker_backup_parse_backup_scheme_raises_error_for_wrong_file_type(
+    dba: DockerComposeBackupAdapter, tmp_path: Path
+) -> None:
     file = tmp_path.joinpath("no_json.txt")
     file.touch()
 
@@ -159,17 +177,19 @@ def test_docker_backup_parse_backup_scheme_raises_error_for_wrong_file_type(tmp_
         dba.parse_backup_scheme(file)
 
 
-def test_docker_backup_parse_storage_info_raises_error_when_multiple_files_are_speccified(tmp_path: Path) -> None:
-    dba = DockerComposeBackupAdapter()
-
+def test_docker_backup_parse_storage_info_raises_error_when_multiple_files_are_speccified(
+    dba: DockerComposeBackupAdapter, tmp_path: Path
+) -> None:
     with pytest.raises(RuntimeError):
         dba.parse_storage_info([Path("/first/path"), Path("/second/path")], tmp_path)
 
 
 def test_docker_backup_parse_storage_info_returns_list_of_docker_compose_services(
-    tmp_path: Path, dummy_docker_compose_file: Path
+    dba: DockerComposeBackupAdapter,
+    tmp_path: Path,
+    dummy_docker_compose_file: Path,
+    preloaded_compose_file: Dict,
 ) -> None:
-    dba = DockerComposeBackupAdapter()
 
     result = dba.parse_storage_info([dummy_docker_compose_file], tmp_path)
 
@@ -179,70 +199,79 @@ def test_docker_backup_parse_storage_info_returns_list_of_docker_compose_service
     assert "second_service" in service_names
 
 
-def test_docker_backup__parse_volume_returns_correctly_parsed_volume_names_and_mount_points() -> None:
-    dba = DockerComposeBackupAdapter()
-
+def test_docker_backup__parse_volume_returns_correctly_parsed_volume_names_and_mount_points(
+    dba: DockerComposeBackupAdapter,
+) -> None:
     assert dba._parse_volume("volume:/container/mount/point") == ("volume", "/container/mount/point")
     assert dba._parse_volume("./bind_mount:/container/mount/point") == ("./bind_mount", "/container/mount/point")
+    assert dba._parse_volume("volume:/container/mount/point:ro") == ("volume", "/container/mount/point")
 
 
-def test_docker_backup__parse_volume_raises_error_for_invalid_volume_statement() -> None:
-    dba = DockerComposeBackupAdapter()
-
+def test_docker_backup__parse_volume_raises_error_for_invalid_volume_statement(dba: DockerComposeBackupAdapter) -> None:
     with pytest.raises(ValueError):
         dba._parse_volume("invalid_volume_string")
 
 
-def test_docker_backup__make_backup_name_creates_correct_name() -> None:
-    dba = DockerComposeBackupAdapter()
-
+def test_docker_backup__make_backup_name_creates_correct_name(dba: DockerComposeBackupAdapter) -> None:
     assert dba._make_backup_name(Path("/path/to/data"), "data_container") == "data_container-data"
     assert dba._make_backup_name(Path("directory"), "data_container") == "data_container-directory"
 
 
+@pytest.mark.docker
 def test_docker_backup_stopped_system_stops_docker_compose_system(
-    docker_client: DockerClient, running_docker_compose_project: Callable, sample_docker_compose_project_dir: Path
+    dba: DockerComposeBackupAdapter,
+    docker_client: DockerClient,
+    running_docker_compose_project: Callable,
+    sample_docker_compose_project_dir: Path,
 ) -> None:
     compose_file = sample_docker_compose_project_dir.joinpath("docker-compose.yaml")
 
     with running_docker_compose_project(compose_file) as _:
-        dba = DockerComposeBackupAdapter()
-        dba.config_files = [compose_file]
-
         with dba.stopped_system(test_system_storage_info) as __:
-            containers = [container.name for container in docker_client.containers.list(filters={"status": "exited"})]
-            assert "bind_mount_service" in containers
-            assert "volume_service" in containers
-            assert "mysql_service" in containers
+            exited = {container.name for container in docker_client.containers.list(filters={"status": "exited"})}
+            assert set(test_system_storage_info) <= exited
 
-        containers = [container.name for container in docker_client.containers.list(filters={"status": "running"})]
-        assert "bind_mount_service" in containers
-        assert "volume_service" in containers
-        assert "mysql_service" in containers
+        running = {container.name for container in docker_client.containers.list(filters={"status": "running"})}
+        assert set(test_system_storage_info) <= running
 
 
+@pytest.mark.docker
 def test_stopped_system_does_not_restart_system_when_it_has_not_been_running(
-    sample_docker_compose_project_dir: Path, docker_client: DockerClient
+    dba: DockerComposeBackupAdapter,
+    sample_docker_compose_project_dir: Path,
+    docker_client: DockerClient,
 ) -> None:
     compose_file = sample_docker_compose_project_dir.joinpath("docker-compose.yaml")
-    dba = DockerComposeBackupAdapter()
-    dba.config_files = [compose_file]
+    # the session-scoped compose project might still be running, stopping (instead of removing) its containers lets
+    # later tests restart them without re-creating them
+    docker_compose_stop(compose_file)
 
     with dba.stopped_system(test_system_storage_info) as _:
-        containers = [container.name for container in docker_client.containers.list(filters={"status": "running"})]
-        assert "bind_mount_service" not in containers
-        assert "volume_service" not in containers
-        assert "mysql_service" not in containers
+        running = {container.name for container in docker_client.containers.list(filters={"status": "running"})}
+        assert not running & set(test_system_storage_info)
+
+    running = {container.name for container in docker_client.containers.list(filters={"status": "running"})}
+    assert not running & set(test_system_storage_info)
+
+
+def test_stopped_system_restarts_containers_when_backup_fails(
+    dba: DockerComposeBackupAdapter, monkeypatch: MonkeyPatch
+) -> None:
+    started: List[List[str]] = []
+    monkeypatch.setitem(dba.__dict__, "docker_client", MagicMock())  # avoids evaluating the cached property
+    monkeypatch.setattr(backupbot.docker_compose.backup, "stop_containers", lambda _, names, **__: names)
+    monkeypatch.setattr(
+        backupbot.docker_compose.backup, "start_containers", lambda _, names, **__: started.append(names)
+    )
 
-    containers = [container.name for container in docker_client.containers.list(filters={"status": "running"})]
-    assert "bind_mount_service" not in containers
-    assert "volume_service" not in containers
-    assert "mysql_service" not in containers
+    with pytest.raises(KeyboardInterrupt):
+        with dba.stopped_system(test_system_storage_info) as _:
+            raise KeyboardInterrupt()
 
+    assert started == [list(test_system_storage_info)]
 
-def test_generate_backup_config(sample_docker_compose_project_dir: Path) -> None:
-    backup_adapter = DockerComposeBackupAdapter()
 
+def test_generate_backup_config(dba: DockerComposeBackupAdapter, sample_docker_compose_project_dir: Path) -> None:
     dummy_storage_info = {
         "service": DockerComposeService(
             name="service",
@@ -265,7 +294,7 @@ def test_generate_backup_config(sample_docker_compose_project_dir: Path) -> None
         ),
     }
 
-    backup_config = backup_adapter.generate_backup_config(storage_info=dummy_storage_info)
+    backup_config = dba.generate_backup_config(storage_info=dummy_storage_info)
 
     assert backup_config == {
         "service": [
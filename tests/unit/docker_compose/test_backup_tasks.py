@@ -1,11 +1,14 @@
 from contextlib import contextmanager
+from logging import WARNING
 from pathlib import Path
-from typing import Callable
+from typing import Callable, List
+from unittest.mock import MagicMock
 
 import pytest
 from pytest import LogCaptureFixture, MonkeyPatch
 
 import backupbot.docker_compose.backup_tasks
+import backupbot.docker_compose.container_utils
 from backupbot.abstract.backup_task import AbstractBackupTask
 from backupbot.data_structures import HostDirectory, Volume
 from backupbot.docker_compose.backup_tasks import (
@@ -15,12 +18,24 @@ from backupbot.docker_compose.backup_tasks import (
 )
 from backupbot.docker_compose.container_utils import (
     BackupItem,
+    get_docker_client,
     stop_and_restart_container,
 )
 from backupbot.docker_compose.storage_info import DockerComposeService
 from backupbot.errors import BackupNotExistingContainerError
 from backupbot.utils import path_to_string
 from tests.utils.dummies import create_dummy_task
+from tests.utils.file_system import assert_tree, count_entries
+
+# the backup tasks only read the service, hence it can be shared by all tests
+test_volume_service = DockerComposeService(
+    name="volume_service",
+    container_name="volume_service",
+    image="ubuntu:latest",
+    hostname="volume_service",
+    volumes=[Volume(name="test_volume", mount_point=Path("/tmp/volume"))],
+    bind_mounts=[],
+)
 
 
 def test_docker_bind_mount_backup_has_accessible_target_dir_name() -> None:
@@ -44,81 +59,116 @@ def test_docker_bind_mount_backup_task_raises_error_when_unknown_attributes_are_
 
 
 def test_docker_bind_mount_backup_task_backs_up_all_bind_mounts(
-    tmp_path: Path, dummy_bind_mount_dir: Path, monkeypatch: MonkeyPatch
+    tmp_path: Path, dummy_bind_mount_dir: Path, cached_tar_file_or_directory: Callable, monkeypatch: MonkeyPatch
 ) -> None:
+    bind_mount1 = dummy_bind_mount_dir / "bind_mount1"
+    bind_mount2 = dummy_bind_mount_dir / "bind_mount2"
+
     service = DockerComposeService(
         name="service1",
         container_name="service1",
         image="some_image",
         hostname="service1",
         bind_mounts=[
-            HostDirectory(path=dummy_bind_mount_dir.joinpath("bind_mount1"), mount_point=Path("/mount1")),
-            HostDirectory(path=dummy_bind_mount_dir.joinpath("bind_mount2"), mount_point=Path("/mount2")),
+            HostDirectory(path=bind_mount1, mount_point=Path("/mount1")),
+            HostDirectory(path=bind_mount2, mount_point=Path("/mount2")),
         ],
         volumes=[],
     )
 
-    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", lambda *_: "TIMESTAMP")
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "get_docker_client", MagicMock)
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: True)
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "tar_file_or_directory", cached_tar_file_or_directory)
 
-    bind_mount_path = tmp_path.joinpath("service1", "bind_mounts")
+    bind_mount_path = tmp_path / "service1" / "bind_mounts"
     bind_mount_path.mkdir(parents=True)
 
     backup_task = DockerBindMountBackupTask(bind_mounts=["all"])
 
     tar_files = backup_task(service=service, backup_task_dir=bind_mount_path)
 
-    tar_file1_dir = bind_mount_path.joinpath(path_to_string(dummy_bind_mount_dir.joinpath("bind_mount1"), num_steps=1))
-    tar_file2_dir = bind_mount_path.joinpath(path_to_string(dummy_bind_mount_dir.joinpath("bind_mount2"), num_steps=1))
-
-    assert tar_file1_dir.is_dir()
-    assert tar_file2_dir.is_dir()
+    tar_file1_dir_name = path_to_string(bind_mount1, num_steps=1)
+    tar_file2_dir_name = path_to_string(bind_mount2, num_steps=1)
 
-    tar_file1 = f"TIMESTAMP-{path_to_string(dummy_bind_mount_dir.joinpath('bind_mount1'), num_steps=1)}.tar.gz"
-    tar_file2 = f"TIMESTAMP-{path_to_string(dummy_bind_mount_dir.joinpath('bind_mount2'), num_steps=1)}.tar.gz"
+    tar_file1_dir = bind_mount_path / tar_file1_dir_name
+    tar_file2_dir = bind_mount_path / tar_file2_dir_name
 
-    tar_file1_file = tar_file1_dir.joinpath(tar_file1)
-    tar_file2_file = tar_file2_dir.joinpath(tar_file2)
+    tar_file1 = f"TIMESTAMP-{tar_file1_dir_name}.tar.gz"
+    tar_file2 = f"TIMESTAMP-{tar_file2_dir_name}.tar.gz"
 
-    assert tar_file1_file.is_file()
-    assert tar_file2_file.is_file()
+    assert_tree(
+        bind_mount_path, {tar_file1_dir_name: {tar_file1: "file"}, tar_file2_dir_name: {tar_file2: "file"}}, exact=True
+    )
 
-    assert tar_files == [tar_file1_file, tar_file2_file]
+    assert tar_files == [tar_file1_dir / tar_file1, tar_file2_dir / tar_file2]
 
 
 def test_docker_bind_mount_backup_task_backs_up_selected_bind_mounts(
-    tmp_path: Path, dummy_bind_mount_dir: Path, monkeypatch: MonkeyPatch
+    tmp_path: Path, dummy_bind_mount_dir: Path, cached_tar_file_or_directory: Callable, monkeypatch: MonkeyPatch
 ) -> None:
+    bind_mount1 = dummy_bind_mount_dir / "bind_mount1"
+    bind_mount2 = dummy_bind_mount_dir / "bind_mount2"
+
     service = DockerComposeService(
         name="service1",
         container_name="service1",
         image="some_image",
         hostname="service1",
         bind_mounts=[
-            HostDirectory(path=dummy_bind_mount_dir.joinpath("bind_mount1"), mount_point=Path("/mount1")),
-            HostDirectory(path=dummy_bind_mount_dir.joinpath("bind_mount2"), mount_point=Path("/mount2")),
+            HostDirectory(path=bind_mount1, mount_point=Path("/mount1")),
+            HostDirectory(path=bind_mount2, mount_point=Path("/mount2")),
         ],
         volumes=[],
     )
 
-    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", lambda *_: "TIMESTAMP")
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "get_docker_client", MagicMock)
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: True)
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "tar_file_or_directory", cached_tar_file_or_directory)
 
-    bind_mount_path = tmp_path.joinpath("service1", "bind_mounts")
+    bind_mount_path = tmp_path / "service1" / "bind_mounts"
     bind_mount_path.mkdir(parents=True)
 
     backup_task = DockerBindMountBackupTask(bind_mounts=["bind_mount2"])
     backup_task(service=service, backup_task_dir=bind_mount_path)
 
-    tar_file_dir = bind_mount_path.joinpath(path_to_string(dummy_bind_mount_dir.joinpath("bind_mount2"), num_steps=1))
+    tar_file_dir_name = path_to_string(bind_mount2, num_steps=1)
+    tar_file = f"TIMESTAMP-{tar_file_dir_name}.tar.gz"
+
+    assert_tree(bind_mount_path, {tar_file_dir_name: {tar_file: "file"}}, exact=True)
+
+
+def test_docker_bind_mount_backup_task_compresses_sequentially_with_pigz(
+    tmp_path: Path, dummy_bind_mount_dir: Path, cached_tar_file_or_directory: Callable, monkeypatch: MonkeyPatch
+) -> None:
+    service = DockerComposeService(
+        name="service1",
+        container_name="service1",
+        image="some_image",
+        hostname="service1",
+        bind_mounts=[
+            HostDirectory(path=dummy_bind_mount_dir / "bind_mount1", mount_point=Path("/mount1")),
+            HostDirectory(path=dummy_bind_mount_dir / "bind_mount2", mount_point=Path("/mount2")),
+        ],
+        volumes=[],
+    )
+    running: List[Path] = []
+
+    def tar_alone(file_or_directory: Path, *args, **kwargs) -> Path:
+        assert not running, "only one pigz pipeline may run at a time"
+        running.append(file_or_directory)
+        try:
+            return cached_tar_file_or_directory(file_or_directory, *args, **kwargs)
+        finally:
+            running.remove(file_or_directory)
 
-    assert tar_file_dir.is_dir()
-    assert len(list(bind_mount_path.iterdir())) == 1
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "get_docker_client", MagicMock)
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: True)
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "parallel_gzip_program", lambda: "pigz")
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "tar_file_or_directory", tar_alone)
 
-    tar_file = path_to_string(dummy_bind_mount_dir.joinpath("bind_mount2"), num_steps=1) + "-TIMESTAMP.tar.gz"
-    tar_file = f"TIMESTAMP-{path_to_string(dummy_bind_mount_dir.joinpath('bind_mount2'), num_steps=1)}.tar.gz"
+    tar_files = DockerBindMountBackupTask(bind_mounts=["all"])(service=service, backup_task_dir=tmp_path)
 
-    assert tar_file_dir.joinpath(tar_file).is_file()
+    assert len(tar_files) == 2
 
 
 def test_docker_bind_mount_backup_task_equality() -> None:
@@ -128,6 +178,9 @@ def test_docker_bind_mount_backup_task_equality() -> None:
     assert not DockerBindMountBackupTask(["item1", "item2"]) != DockerBindMountBackupTask(["item2", "item1"])
     assert DockerBindMountBackupTask(["item1"]) != DockerBindMountBackupTask(["item1", "item2"])
 
+    assert hash(DockerBindMountBackupTask(["item1", "item2"])) == hash(DockerBindMountBackupTask(["item2", "item1"]))
+    assert DockerBindMountBackupTask(["item1"]) != DockerVolumeBackupTask(["item1"])
+
 
 def test_docker_volume_backup_task_equality() -> None:
     assert DockerVolumeBackupTask(["item1", "item2"]) == DockerVolumeBackupTask(["item2", "item1"])
@@ -136,17 +189,78 @@ def test_docker_volume_backup_task_equality() -> None:
     assert not DockerVolumeBackupTask(["item1", "item2"]) != DockerVolumeBackupTask(["item2", "item1"])
     assert DockerVolumeBackupTask(["item1"]) != DockerVolumeBackupTask(["item1", "item2"])
 
+    assert hash(DockerVolumeBackupTask(["item1", "item2"])) == hash(DockerVolumeBackupTask(["item2", "item1"]))
 
-def test_docker_volume_backup_task_equality() -> None:
+
+def test_docker_mysql_backup_task_equality() -> None:
     assert DockerMySQLBackupTask("value1", "value2", "value3") == DockerMySQLBackupTask("value1", "value2", "value3")
     assert not DockerMySQLBackupTask("value1", "value2", "value3") == DockerMySQLBackupTask(
         "value1", "value4", "value5"
     )
+    assert not DockerMySQLBackupTask("value1", "value2", "value3") == DockerMySQLBackupTask(
+        "value1", "value2", "value3", compress=True
+    )
+
+
+def test_docker_mysql_backup_task_repr_distinguishes_compression() -> None:
+    assert repr(DockerMySQLBackupTask("database", "user", "password")) != repr(
+        DockerMySQLBackupTask("database", "user", "password", compress=True)
+    )
+
+
+def test_mysql_task_equality_does_not_touch_docker(monkeypatch: MonkeyPatch) -> None:
+    from_env = MagicMock()
+    monkeypatch.setattr(backupbot.docker_compose.container_utils, "from_env", from_env)
+    get_docker_client.cache_clear()
+
+    assert DockerMySQLBackupTask("database", "user", "password") == DockerMySQLBackupTask(
+        "database", "user", "password"
+    )
+
+    assert from_env.call_count == 0
+
+
+def test_docker_mysql_backup_task_create_mysql_backup_item(tmp_path: Path) -> None:
+    dump = "mysqldump --password=password --user=user database > /backup/TIMESTAMP-database.sql"
+
+    assert DockerMySQLBackupTask("database", "user", "password")._create_mysql_backup_item(tmp_path) == BackupItem(
+        command=None, exec=dump, file_name="TIMESTAMP-database.sql", final_path=tmp_path.joinpath("database")
+    )
+    assert DockerMySQLBackupTask("database", "user", "password", compress=True)._create_mysql_backup_item(
+        tmp_path
+    ) == BackupItem(
+        command=None,
+        exec=f"{dump} && gzip /backup/TIMESTAMP-database.sql",
+        file_name="TIMESTAMP-database.sql.gz",
+        final_path=tmp_path.joinpath("database"),
+    )
 
 
-def test_docker_volume_backup_task_prepare_volume_backup(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
-    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", lambda *_: "TIMESTAMP")
+def test_backup_tasks_reuse_docker_client(monkeypatch: MonkeyPatch) -> None:
+    from_env = MagicMock()
+    monkeypatch.setattr(backupbot.docker_compose.container_utils, "from_env", from_env)
+    get_docker_client.cache_clear()
 
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: False)
+    service = DockerComposeService(
+        name="test", container_name="test", image="test", hostname="test", volumes=[], bind_mounts=[]
+    )
+
+    try:
+        for task in [
+            DockerMySQLBackupTask("database", "user", "password"),
+            DockerMySQLBackupTask("database", "user", "password"),
+            DockerVolumeBackupTask(["volume"]),
+        ]:
+            with pytest.raises(BackupNotExistingContainerError):
+                task(service, None)
+    finally:
+        get_docker_client.cache_clear()  # do not leak the mock into other tests
+
+    assert from_env.call_count == 1
+
+
+def test_docker_volume_backup_task_prepare_volume_backup(tmp_path: Path) -> None:
     target_dir = tmp_path.joinpath("target_dir")
     temp_dir = tmp_path.joinpath("temp_dir")
 
@@ -172,11 +286,45 @@ def test_docker_volume_backup_task_prepare_volume_backup(tmp_path: Path, monkeyp
         ),
     ]
 
-    assert target_dir.joinpath("volume1").is_dir()
-    assert target_dir.joinpath("volume2").is_dir()
-    assert len(list(target_dir.iterdir())) == 2
+    assert_tree(target_dir, {"volume1": "dir", "volume2": "dir"}, exact=True)
+
+
+def test_docker_volume_backup_task_prepare_volume_backup_calls_timestamp_once(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    timestamp = MagicMock(return_value="TIMESTAMP")
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", timestamp)
+
+    volumes = [Volume(name="volume1", mount_point=Path("/mount1")), Volume(name="volume2", mount_point=Path("/mount2"))]
+
+    DockerVolumeBackupTask([volume.name for volume in volumes])._prepare_volume_backup(volumes, target_dir=tmp_path)
+
+    timestamp.assert_called_once()
+
+
+def test_docker_volume_backup_task_prepare_volume_backup_only_adds_volume_once(
+    tmp_path: Path, caplog: LogCaptureFixture
+) -> None:
+    volume = Volume(name="volume1", mount_point=Path("/mount1"))
+    same_volume_other_mount_point = Volume(name="volume1", mount_point=Path("/mount2"))
+
+    backup_task = DockerVolumeBackupTask([volume.name])
+
+    backup_items = backup_task._prepare_volume_backup(
+        [volume, volume, same_volume_other_mount_point], target_dir=tmp_path
+    )
+
+    assert backup_items == [
+        BackupItem(
+            command="tar -czf /backup/TIMESTAMP-volume1.tar.gz /mount1",
+            file_name="TIMESTAMP-volume1.tar.gz",
+            final_path=tmp_path.joinpath("volume1"),
+        )
+    ]
+    assert caplog.record_tuples == [("backupbot.logger", WARNING, "Skipped 2 duplicate volume(s): volume1.")]
 
 
+@pytest.mark.docker
 def test_docker_volume_backup_call_creates_tar_files_in_temporary_directory(
     tmp_path: Path,
     running_docker_compose_project: Callable,
@@ -191,34 +339,24 @@ def test_docker_volume_backup_call_creates_tar_files_in_temporary_directory(
         yield temporary_directory
 
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "TemporaryDirectory", dummy_TemporayDirectory)
-    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", lambda *_: "TIMESTAMP")
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: True)
 
     target_dir = tmp_path.joinpath("target")
     target_dir.mkdir()
 
-    volumes = [Volume(name="test_volume", mount_point=Path("/tmp/volume"))]
-
-    service = DockerComposeService(
-        name="volume_service",
-        container_name="volume_service",
-        image="ubuntu:latest",
-        hostname="volume_service",
-        volumes=volumes,
-        bind_mounts=[],
-    )
-    backup_task = DockerVolumeBackupTask([volume.name for volume in volumes])
+    backup_task = DockerVolumeBackupTask([volume.name for volume in test_volume_service.volumes])
 
     with running_docker_compose_project(sample_docker_compose_project_dir.joinpath("docker-compose.yaml")) as _:
-        created_files = backup_task(service=service, target_dir=target_dir)
+        created_files = backup_task(service=test_volume_service, target_dir=target_dir)
 
     assert temporary_directory.joinpath("TIMESTAMP-test_volume.tar.gz").is_file()
-    assert len(list(temporary_directory.iterdir())) == 1
+    assert count_entries(temporary_directory) == 1
 
     # make sure that created files are returned as list (following a bug in early development):
     assert created_files == [target_dir.joinpath("test_volume", "TIMESTAMP-test_volume.tar.gz")]
 
 
+@pytest.mark.docker
 def test_docker_volume_backup_call_with_failing_docker_container(
     tmp_path: Path,
     running_docker_compose_project: Callable,
@@ -233,21 +371,10 @@ def test_docker_volume_backup_call_with_failing_docker_container(
         lambda *_: [BackupItem(failing_tar_command, Path("test_volume.tar.gz"), Path("/"))],
     )
 
-    volumes = [Volume(name="test_volume", mount_point=Path("/tmp/volume"))]
-
-    service = DockerComposeService(
-        name="volume_service",
-        container_name="volume_service",
-        image="ubuntu:latest",
-        hostname="volume_service",
-        volumes=volumes,
-        bind_mounts=[],
-    )
-
-    backup_task = DockerVolumeBackupTask([volume.name for volume in volumes])
+    backup_task = DockerVolumeBackupTask([volume.name for volume in test_volume_service.volumes])
 
     with running_docker_compose_project(sample_docker_compose_project_dir.joinpath("docker-compose.yaml")) as _:
-        backup_task(service=service, target_dir=tmp_path)
+        backup_task(service=test_volume_service, target_dir=tmp_path)
 
     log_msg = caplog.record_tuples[1][2]
 
@@ -257,6 +384,7 @@ def test_docker_volume_backup_call_with_failing_docker_container(
     )
 
 
+@pytest.mark.docker
 def test_docker_mysql_backup_task_backs_up_mysql_contents(
     tmp_path: Path,
     running_docker_compose_project: Callable,
@@ -271,7 +399,6 @@ def test_docker_mysql_backup_task_backs_up_mysql_contents(
         yield temporary_directory
 
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "TemporaryDirectory", dummy_TemporayDirectory)
-    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "timestamp", lambda *_: "TIMESTAMP")
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: True)
 
     target_dir = tmp_path.joinpath("target")
@@ -294,7 +421,7 @@ def test_docker_mysql_backup_task_backs_up_mysql_contents(
     backup_task = DockerMySQLBackupTask(database="test_database", user="root", password="root_password_42")
 
     with running_docker_compose_project(sample_docker_compose_project_dir.joinpath("docker-compose.yaml")) as _:
-        with stop_and_restart_container(client=backup_task._docker_client, container_name="mysql_service"):
+        with stop_and_restart_container(client=get_docker_client(), container_name="mysql_service"):
             created_files = backup_task(service=service, target_dir=target_dir)
 
     dump_file = temporary_directory.joinpath("TIMESTAMP-test_database.sql")
@@ -303,7 +430,7 @@ def test_docker_mysql_backup_task_backs_up_mysql_contents(
     file_content = dump_file.read_text("utf-8")
 
     assert target_dir.joinpath("test_database", "TIMESTAMP-test_database.sql") in created_files
-    assert len(list(temporary_directory.iterdir())) == 1
+    assert count_entries(temporary_directory) == 1
 
     # table is created via scropt /mount/create.sh in mysql_service
     create_table_command = """CREATE TABLE `test` (
@@ -319,6 +446,7 @@ def test_docker_mysql_backup_task_backs_up_mysql_contents(
 
 
 def test_backup_tasks_raise_when_container_does_not_exit(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "get_docker_client", MagicMock)
     monkeypatch.setattr(backupbot.docker_compose.backup_tasks, "container_exists", lambda *_, **__: False)
 
     service = DockerComposeService(
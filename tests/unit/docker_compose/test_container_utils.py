@@ -1,73 +1,81 @@
+import subprocess
+from dataclasses import FrozenInstanceError
+from logging import ERROR
 from pathlib import Path
+from threading import Barrier
+from typing import Callable, List
+from unittest.mock import MagicMock, patch
 
 import pytest
 from docker import DockerClient
+from docker.errors import ContainerError
+from docker.models.containers import Container
+from pytest import LogCaptureFixture
 
 from backupbot.docker_compose.container_utils import (
+    BackupItem,
     docker_compose_down,
     docker_compose_start,
     docker_compose_stop,
     docker_compose_up,
+    shell_backup,
+    start_containers,
     stop_and_restart_container,
+    stop_containers,
 )
 
 
-def test_stop_and_restart_container(docker_client: DockerClient):
-    container_name = "sleeping_ubuntu"
-    docker_client.containers.run("ubuntu:latest", "sleep infinity", name=container_name, detach=True)
-    docker_client.containers.get(container_name)
+@pytest.mark.docker
+def test_stop_and_restart_container(docker_client: DockerClient, sleeping_container: Container):
+    with stop_and_restart_container(docker_client, sleeping_container.name, timeout=5) as stopped_container:
+        sleeping_container.reload()
+        assert sleeping_container.status == "exited"
 
-    with stop_and_restart_container(docker_client, container_name, timeout=5) as stopped_container:
-        assert docker_client.containers.get(container_name).status == "exited"
+    sleeping_container.reload()
+    assert sleeping_container.status == "running"
 
-    assert docker_client.containers.get(container_name).status == "running"
 
-    docker_client.containers.get(container_name).stop()
-    docker_client.containers.get(container_name).remove()
+@pytest.mark.docker
+def test_stop_and_restart_container_raises_error_when_container_is_not_running(
+    docker_client: DockerClient, sleeping_container: Container
+) -> None:
+    sleeping_container.stop()
 
-
-def test_stop_and_restart_container_raises_error_when_container_is_not_running(docker_client: DockerClient) -> None:
-    container_name = "sleeping_ubuntu"
-    docker_client.containers.run("ubuntu:latest", "sleep infinity", name=container_name, detach=True)
-    docker_client.containers.get(container_name).stop()
-
-    with pytest.raises(RuntimeError):
-        with stop_and_restart_container(docker_client, container_name) as _:
-            pass
-
-    docker_client.containers.get(container_name).remove()
+    try:
+        with pytest.raises(RuntimeError):
+            with stop_and_restart_container(docker_client, sleeping_container.name) as _:
+                pass
+    finally:
+        sleeping_container.start()  # the container is shared with other tests of this module
 
 
+@pytest.mark.docker
 def test_docker_compose(sample_docker_compose_project_dir: Path, docker_client: DockerClient) -> None:
     compose_file = sample_docker_compose_project_dir.joinpath("docker-compose.yaml")
+    services = {"bind_mount_service", "volume_service", "mysql_service"}
+    name_filter = list(services)
 
     docker_compose_up(compose_file)
-    containers = [container.name for container in docker_client.containers.list()]
+    running = {container.name for container in docker_client.containers.list(filters={"name": name_filter})}
 
-    assert "bind_mount_service" in containers
-    assert "volume_service" in containers
-    assert "mysql_service" in containers
+    assert services <= running
 
     docker_compose_stop(compose_file)
-    containers = [container.name for container in docker_client.containers.list(filters={"status": "exited"})]
+    exited = {
+        container.name for container in docker_client.containers.list(filters={"name": name_filter, "status": "exited"})
+    }
 
-    assert "bind_mount_service" in containers
-    assert "volume_service" in containers
-    assert "mysql_service" in containers
+    assert services <= exited
 
     docker_compose_start(compose_file)
-    containers = [container.name for container in docker_client.containers.list()]
+    running = {container.name for container in docker_client.containers.list(filters={"name": name_filter})}
 
-    assert "bind_mount_service" in containers
-    assert "volume_service" in containers
-    assert "mysql_service" in containers
+    assert services <= running
 
     docker_compose_down(compose_file)
-    containers = [container.name for container in docker_client.containers.list(all=True)]
+    existing = {container.name for container in docker_client.containers.list(all=True, filters={"name": name_filter})}
 
-    assert "bind_mount_service" not in containers
-    assert "volume_service" not in containers
-    assert "mysql_service" not in containers
+    assert not services & existing
 
 
 def test_docker_compose_up_raises_error_for_invalid_compose_file() -> None:
@@ -100,3 +108,139 @@ def test_docker_compose_down_raises_error_for_invalid_compose_file() -> None:
 
     with pytest.raises(RuntimeError):
         docker_compose_down(Path("not/existing.yaml"))
+
+
+@pytest.mark.docker
+def test_stop_containers_stops_only_running_specified_containers_and_start_containers_restarts_them(
+    sample_docker_compose_project_dir: Path, running_docker_compose_project: Callable, docker_client: DockerClient
+) -> None:
+    compose_file = sample_docker_compose_project_dir.joinpath("docker-compose.yaml")
+
+    with running_docker_compose_project(compose_file) as _:
+        stopped = stop_containers(docker_client, ["bind_mount_service", "volume_service", "not_existing"])
+
+        assert set(stopped) == {"bind_mount_service", "volume_service"}
+        running = {container.name for container in docker_client.containers.list(filters={"status": "running"})}
+        assert "bind_mount_service" not in running
+        assert "volume_service" not in running
+        assert "mysql_service" in running
+
+        start_containers(docker_client, stopped)
+
+        running = {container.name for container in docker_client.containers.list(filters={"status": "running"})}
+        assert {"bind_mount_service", "volume_service", "mysql_service"} <= running
+
+
+def test_stop_containers_stops_containers_concurrently() -> None:
+    barrier = Barrier(2, timeout=5)  # breaks unless both containers are stopped at the same time
+    containers = [MagicMock(), MagicMock(), MagicMock()]
+    for name, container in zip(["service1", "service2", "other_service"], containers):
+        container.name = name
+        container.stop.side_effect = lambda **_: barrier.wait()
+    docker_client = MagicMock()
+    docker_client.containers.list.return_value = containers
+
+    stopped = stop_containers(docker_client, ["service1", "service2"])
+
+    assert stopped == ["service1", "service2"]
+    docker_client.containers.list.assert_called_once()
+    containers[2].stop.assert_not_called()
+
+
+def test_stop_and_start_containers_follow_dependency_order() -> None:
+    calls: List[str] = []
+    depends_on = {"app": ["db", "cache"], "cache": ["db"]}
+    containers = {}
+    for name in ["app", "cache", "db"]:
+        container = MagicMock()
+        container.name = name
+        container.stop.side_effect = lambda name=name, **kwargs: calls.append(f"stop {name} {kwargs['timeout']}")
+        container.start.side_effect = lambda name=name: calls.append(f"start {name}")
+        containers[name] = container
+    docker_client = MagicMock()
+    docker_client.containers.list.return_value = list(containers.values())
+    docker_client.containers.get.side_effect = containers.get
+
+    stopped = stop_containers(docker_client, ["app", "cache", "db"], depends_on=depends_on, stop_timeouts={"db": 30})
+    start_containers(docker_client, stopped, depends_on=depends_on)
+
+    assert calls == ["stop app 10", "stop cache 10", "stop db 30", "start db", "start cache", "start app"]
+
+
+def test_shell_backup_runs_all_commands_in_a_single_container(tmp_path: Path) -> None:
+    docker_client = MagicMock()
+    backup_items = [
+        BackupItem("tar -czf /backup/volume1.tar.gz /mount1", "volume1.tar.gz", tmp_path),
+        BackupItem("tar -czf /backup/volume2.tar.gz /mount2", "volume2.tar.gz", tmp_path),
+    ]
+    tmp_path.joinpath("volume1.tar.gz").touch()  # the second command "fails" to create its file
+
+    mapping = shell_backup(docker_client, "ubuntu:latest", tmp_path, "service", backup_items)
+
+    docker_client.containers.run.assert_called_once()
+    assert docker_client.containers.run.call_args.kwargs["command"] == [
+        "sh",
+        "-c",
+        "rc=0 ; "
+        "tar -czf /backup/volume1.tar.gz /mount1 || { rm -f /backup/volume1.tar.gz ; rc=1 ; } ; "
+        "tar -czf /backup/volume2.tar.gz /mount2 || { rm -f /backup/volume2.tar.gz ; rc=1 ; } ; "
+        "exit $rc",
+    ]
+    assert mapping == {backup_items[0]: tmp_path.joinpath("volume1.tar.gz"), backup_items[1]: None}
+
+
+def test_shell_backup_maps_failing_batch_command_to_none(tmp_path: Path, caplog: LogCaptureFixture) -> None:
+    docker_client = MagicMock()
+    backup_items = [
+        BackupItem("echo data > /backup/volume0.tar.gz", "volume0.tar.gz", tmp_path),
+        BackupItem(
+            "echo truncated > /backup/volume1.tar.gz && echo 'tar: error' >&2 && false", "volume1.tar.gz", tmp_path
+        ),
+        BackupItem("echo data > /backup/volume2.tar.gz", "volume2.tar.gz", tmp_path),
+    ]
+
+    def run(image: str, command: List[str], **_) -> None:
+        # emulate the container by running its script with the bind mount replaced by the temporary directory
+        process = subprocess.run([*command[:2], command[2].replace("/backup", str(tmp_path))], capture_output=True)
+        if process.returncode != 0:
+            raise ContainerError(MagicMock(), process.returncode, command, image, process.stderr)
+
+    docker_client.containers.run.side_effect = run
+
+    mapping = shell_backup(docker_client, "ubuntu:latest", tmp_path, "service", backup_items)
+
+    assert mapping == {
+        backup_items[0]: tmp_path.joinpath("volume0.tar.gz"),
+        backup_items[1]: None,
+        backup_items[2]: tmp_path.joinpath("volume2.tar.gz"),
+    }
+    assert (
+        "backupbot.logger",
+        ERROR,
+        "Backup commands in image 'ubuntu:latest' failed with exit code 1: tar: error\n",
+    ) in caplog.record_tuples
+
+
+def test_shell_backup_names_backup_containers_uniquely(tmp_path: Path) -> None:
+    docker_client = MagicMock()
+    backup_items = [
+        BackupItem("tar -czf /backup/volume.tar.gz /mount", "volume.tar.gz", tmp_path),
+        BackupItem("sleep infinity", "dump.sql", tmp_path, exec="mysqldump > /backup/dump.sql"),
+    ]
+
+    with patch("backupbot.docker_compose.container_utils.docker_exec_loop"):
+        shell_backup(docker_client, "ubuntu:latest", tmp_path, "service", backup_items)
+        shell_backup(docker_client, "ubuntu:latest", tmp_path, "service", backup_items)
+
+    names = [call.kwargs["name"] for call in docker_client.containers.run.call_args_list]
+    assert len(names) == len(set(names)) == 4
+    assert all("service" in name for name in names)
+
+
+def test_backup_item_is_immutable_and_hashable(tmp_path: Path) -> None:
+    backup_item = BackupItem("tar -czf /backup/volume.tar.gz /mount", "volume.tar.gz", tmp_path)
+
+    with pytest.raises(FrozenInstanceError):
+        backup_item.file_name = "other.tar.gz"  # type: ignore[misc]
+
+    assert hash(backup_item) == hash(BackupItem("other command", "volume.tar.gz", tmp_path))
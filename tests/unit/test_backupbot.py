@@ -3,10 +3,12 @@
 from dataclasses import dataclass
 from logging import ERROR
 from pathlib import Path
+from threading import Barrier
 from typing import Callable, Dict, List, Optional
 
 import pytest
 from docker import DockerClient
+from docker.errors import APIError
 from pytest import LogCaptureFixture, MonkeyPatch
 
 import backupbot.docker_compose.backup_tasks
@@ -14,6 +16,7 @@ from backupbot.abstract.backup_task import AbstractBackupTask
 from backupbot.abstract.storage_info import AbstractStorageInfo
 from backupbot.backupbot import BackupBot
 from tests.utils.dummies import create_dummy_task
+from tests.utils.file_system import assert_tree, count_entries
 
 
 class DummyStorageInfo(AbstractStorageInfo):
@@ -62,17 +65,14 @@ def test_create_service_backup_structure(tmp_path: Path) -> None:
 
     bub.create_service_backup_structure(storage_info=storage_info, backup_tasks=backup_tasks)
 
-    assert tmp_path.joinpath("service1").is_dir()
-    assert tmp_path.joinpath("service1", "dummy_task1").is_dir()
-    assert tmp_path.joinpath("service1", "dummy_task2").is_dir()
-
-    assert tmp_path.joinpath("service2").is_dir()
-    assert tmp_path.joinpath("service2", "dummy_task3").is_dir()
-
-    assert len(list(tmp_path.iterdir())) == 2
+    assert_tree(
+        tmp_path,
+        {"service1": {"dummy_task1": "dir", "dummy_task2": "dir"}, "service2": {"dummy_task3": "dir"}},
+        exact=True,
+    )
 
-    assert len(list(tmp_path.joinpath("service1").iterdir())) == 2
-    assert len(list(tmp_path.joinpath("service2").iterdir())) == 1
+    assert count_entries(tmp_path.joinpath("service1")) == 2
+    assert count_entries(tmp_path.joinpath("service2")) == 1
 
 
 def test_create_service_backup_structure_creates_directories_only_when_specified_in_config_file(tmp_path: Path) -> None:
@@ -86,7 +86,7 @@ def test_create_service_backup_structure_creates_directories_only_when_specified
 
     bub.create_service_backup_structure(storage_info=storage_info, backup_tasks=backup_tasks)
 
-    assert len(list(tmp_path.iterdir())) == 1
+    assert count_entries(tmp_path) == 1
     assert tmp_path.joinpath("service1").is_dir()
 
 
@@ -112,19 +112,19 @@ def test_backupbot_backs_up_docker_compose_bind_mount(
     with running_docker_compose_project(compose_file) as _:
         bub.run_backup()
 
-    assert len(list(tmp_path.iterdir())) == 1
+    assert count_entries(tmp_path) == 1
     assert tmp_path.joinpath("bind_mount_service").is_dir()
 
     bind_mounts_task_dir = tmp_path.joinpath("bind_mount_service", "bind_mounts")
-    assert len(list(bind_mounts_task_dir.iterdir())) == 1
+    assert count_entries(bind_mounts_task_dir) == 1
     assert bind_mounts_task_dir.is_dir()
 
     bind_mount_dir = bind_mounts_task_dir.joinpath("bind_mount")
-    assert len(list(bind_mount_dir.iterdir())) == 1
+    assert count_entries(bind_mount_dir) == 1
     assert bind_mount_dir.is_dir()
 
     file = bind_mount_dir.joinpath("TIMESTAMP-bind_mount.tar.gz")
-    assert len(list(bind_mount_dir.iterdir())) == 1
+    assert count_entries(bind_mount_dir) == 1
     assert file.is_file()
 
 
@@ -185,6 +185,37 @@ def test_run_backup_tasks_logs_runtime_error(caplog: LogCaptureFixture, monkeypa
     ) in caplog.record_tuples
 
 
+def test_run_backup_tasks_logs_docker_api_error(caplog: LogCaptureFixture, monkeypatch: MonkeyPatch) -> None:
+    bub = BackupBot(Path("unimportant"), destination_directory=Path("unimportant"), backup_config=Path("unimportant"))
+    monkeypatch.setattr(RaisingBackupTask, "__call__", lambda *_, **__: raise_error(APIError, "api error"))
+
+    backup_tasks: Dict[str, List[AbstractBackupTask]] = {"service_name": [RaisingBackupTask(), RaisingBackupTask()]}
+
+    stats = bub._run_backup_tasks({"service_name": []}, backup_tasks)
+
+    assert stats == {"success": 0, "error": 2}
+    assert (
+        "backupbot.logger",
+        ERROR,
+        "Failed to execute backup task 'RaisingBackupTask': 'api error'.",
+    ) in caplog.record_tuples
+
+
+def test_run_backup_tasks_backs_up_services_concurrently(monkeypatch: MonkeyPatch) -> None:
+    bub = BackupBot(Path("unimportant"), destination_directory=Path("unimportant"), backup_config=Path("unimportant"))
+    barrier = Barrier(2, timeout=5)  # breaks unless both services' tasks run at the same time
+    monkeypatch.setattr(RaisingBackupTask, "__call__", lambda *_, **__: barrier.wait())
+
+    backup_tasks: Dict[str, List[AbstractBackupTask]] = {
+        "service1": [RaisingBackupTask()],
+        "service2": [RaisingBackupTask()],
+    }
+
+    stats = bub._run_backup_tasks({"service1": [], "service2": []}, backup_tasks)
+
+    assert stats == {"success": 2, "error": 0}
+
+
 def test_generate_backup_config(tmp_path: Path, sample_docker_compose_project_dir: Path) -> None:
     bub = BackupBot(root=sample_docker_compose_project_dir, destination_directory=Path("unused"))
 
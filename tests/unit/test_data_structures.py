@@ -11,6 +11,8 @@ def test_fileversion_inequalities() -> None:
     assert not FileVersion(major=2, minor=1) < FileVersion(major=2, minor=1)
     assert FileVersion(major=2, minor=1) <= FileVersion(major=2, minor=1)
     assert FileVersion(major=2, minor=0) > FileVersion(major=1, minor=1)
+    assert not FileVersion(major=2, minor=0) < FileVersion(major=1, minor=1)
+    assert not FileVersion(major=1, minor=1) > FileVersion(major=2, minor=0)
 
 
 def test_fileversion_raises_error_for_comparisons_with_other_type() -> None:
@@ -28,3 +30,7 @@ def test_fileversion_increase_minor() -> None:
     fversion = FileVersion(2, 1)
     fversion.increase_minor()
     assert fversion == FileVersion(2, 2)
+
+
+def test_fileversion_has_no_instance_dict() -> None:
+    assert not hasattr(FileVersion(2, 1), "__dict__")
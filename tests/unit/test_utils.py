@@ -1,27 +1,32 @@
 """Unit tests for module backupbot.utils."""
 
+import os
 import subprocess
+import tarfile
+from logging import WARNING
 from pathlib import Path
 from typing import List
 
 import backupbot.utils
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
+from pytest import LogCaptureFixture
 from backupbot.utils import (
+    PARALLEL_GZIP_MIN_BYTES,
     absolute_path,
     get_volume_path,
     load_yaml_file,
     match_files,
     path_to_string,
+    size_exceeds,
     tar_file_or_directory,
     copy_files,
 )
+from tests.utils.file_system import assert_tree, make_tree
 
 
 def test_match_files_finds_single_file(tmp_path: Path) -> None:
-    tmp_path.joinpath("services", "data").mkdir(parents=True)
-    tmp_path.joinpath("services", "other_data", "more_data").mkdir(parents=True)
-    tmp_path.joinpath("services", "docker-compose.yaml").touch()
+    make_tree(tmp_path, "services/data/", "services/other_data/more_data/", "services/docker-compose.yaml")
 
     result: List[Path] = []
     match_files(tmp_path, ".yaml", result)
@@ -30,27 +35,24 @@ def test_match_files_finds_single_file(tmp_path: Path) -> None:
 
 
 def test_match_files_finds_multiple_files(tmp_path: Path) -> None:
-    tmp_path.joinpath("services", "data").mkdir(parents=True)
-    tmp_path.joinpath("services", "other_data", "more_data").mkdir(parents=True)
-
-    tmp_path.joinpath("services", "docker-compose.yaml").touch()
-    tmp_path.joinpath("services", "data", "docker-compose.yaml").touch()
-    tmp_path.joinpath("services", "other_data", "more_data", "docker-compose.yaml").touch()
+    make_tree(
+        tmp_path,
+        "services/docker-compose.yaml",
+        "services/data/docker-compose.yaml",
+        "services/other_data/more_data/docker-compose.yaml",
+    )
 
     result: List[Path] = []
-    match_files(tmp_path, "*.yaml", result)
+    match_files(tmp_path, ".yaml", result)
 
     # order does not matter:
-    assert not (
-        set(result).difference(
-            [
-                tmp_path.joinpath("services", "docker-compose.yaml"),
-                tmp_path.joinpath("services", "data", "docker-compose.yaml"),
-                tmp_path.joinpath("services", "other_data", "more_data", "docker-compose.yaml"),
-            ]
-        )
-    )
-    assert len(result) == len(set(result))  # to make sure no doubles are found
+    found = set(result)
+    assert found == {
+        tmp_path.joinpath("services", "docker-compose.yaml"),
+        tmp_path.joinpath("services", "data", "docker-compose.yaml"),
+        tmp_path.joinpath("services", "other_data", "more_data", "docker-compose.yaml"),
+    }
+    assert len(result) == len(found)  # to make sure no doubles are found
 
 
 def test_match_files_returns_empty_list_when_no_files_match(tmp_path: Path) -> None:
@@ -66,10 +68,13 @@ def test_match_files_raises_error_for_invalid_directory() -> None:
 
 
 def test_match_files_matches_files_with_containing_pattern(tmp_path: Path) -> None:
-    tmp_path.joinpath("services", "data").mkdir(parents=True)
-    tmp_path.joinpath("services", "other_data", "more_data").mkdir(parents=True)
-    tmp_path.joinpath("services", "file.txt").touch()
-    tmp_path.joinpath("services", "other_data", "fileXYZ.txt").touch()
+    make_tree(
+        tmp_path,
+        "services/data/",
+        "services/other_data/more_data/",
+        "services/file.txt",
+        "services/other_data/fileXYZ.txt",
+    )
 
     result: List[Path] = []
     match_files(tmp_path, "file", result)
@@ -80,6 +85,16 @@ def test_match_files_matches_files_with_containing_pattern(tmp_path: Path) -> No
     ]
 
 
+def test_match_files_does_not_follow_directory_symlinks(tmp_path: Path) -> None:
+    make_tree(tmp_path, "services/docker-compose.yaml")
+    tmp_path.joinpath("services", "loop").symlink_to(tmp_path, target_is_directory=True)
+
+    result: List[Path] = []
+    match_files(tmp_path, ".yaml", result)
+
+    assert result == [tmp_path.joinpath("services", "docker-compose.yaml")]
+
+
 def test_load_yaml_file_parses_dockerfile_correctly(
     dummy_docker_compose_file: Path,
 ) -> None:
@@ -114,11 +129,40 @@ def test_load_yaml_file_parses_dockerfile_correctly(
     }
 
 
+def test_load_yaml_file_warns_once_when_falling_back_to_pure_python_parser(
+    tmp_path: Path, monkeypatch: MonkeyPatch, caplog: LogCaptureFixture
+) -> None:
+    for name in ["file1.yaml", "file2.yaml"]:
+        tmp_path.joinpath(name).write_text("key: value\n")
+    monkeypatch.setattr(backupbot.utils, "LIBYAML_AVAILABLE", False)
+    backupbot.utils._warn_about_slow_yaml_loader.cache_clear()
+
+    try:
+        load_yaml_file(tmp_path.joinpath("file1.yaml"))
+        load_yaml_file(tmp_path.joinpath("file2.yaml"))
+    finally:
+        backupbot.utils._warn_about_slow_yaml_loader.cache_clear()
+
+    assert [record.levelno for record in caplog.records] == [WARNING]
+
+
 def test_load_yaml_file_raises_error_for_invalid_path() -> None:
     with pytest.raises(FileNotFoundError):
         load_yaml_file(Path("invalid_path"))
 
 
+def test_load_yaml_file_reloads_file_rewritten_with_same_mtime(tmp_path: Path) -> None:
+    yaml_file = tmp_path.joinpath("file.yaml")
+    yaml_file.write_text("key: value\n")
+    mtime_ns = yaml_file.stat().st_mtime_ns
+    assert load_yaml_file(yaml_file) == {"key": "value"}
+
+    yaml_file.write_text("key: other_value\n")
+    os.utime(yaml_file, ns=(mtime_ns, mtime_ns))
+
+    assert load_yaml_file(yaml_file) == {"key": "other_value"}
+
+
 def test_get_volume_path() -> None:
     assert get_volume_path("named_volume:/path/on/container") == "named_volume"
     assert get_volume_path("./bind_mount:/path/on/container") == "./bind_mount"
@@ -142,6 +186,17 @@ def test_tar_file_or_directory_tar_compresses_directory(tmp_path: Path) -> None:
     assert tar.is_file()
 
 
+def test_tar_file_or_directory_stores_members_under_absolute_path(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    tmp_path.joinpath("data").mkdir()
+    tmp_path.joinpath("data", "file").touch()
+    monkeypatch.chdir(tmp_path)
+
+    tar = tar_file_or_directory(Path("data"), "data_tar", Path("."))
+
+    with tarfile.open(tar) as archive:
+        assert tmp_path.joinpath("data", "file").relative_to("/").as_posix() in archive.getnames()
+
+
 def test_tar_file_or_directory_raises_error_for_invalid_paths(tmp_path: Path) -> None:
     tmp_path.joinpath("data").mkdir()
 
@@ -171,6 +226,107 @@ def test_tar_file_or_directory_raises_error_if_tar_file_does_not_exist_after_tar
         tar_file_or_directory(tmp_path, "irrelevant_name", tmp_path)
 
 
+def test_tar_file_or_directory_uses_pigz_for_large_data_if_available(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    calls: List[tuple] = []
+
+    def run(args, **_):
+        calls.append(args)
+        Path(args[-2]).touch()
+        return subprocess.CompletedProcess(args, 0)
+
+    monkeypatch.setattr(backupbot.utils.subprocess, "run", run)
+    monkeypatch.setattr(backupbot.utils, "parallel_gzip_program", lambda: "/usr/bin/pigz")
+
+    small = tmp_path.joinpath("small")
+    large = tmp_path.joinpath("large")
+    small.mkdir()
+    large.mkdir()
+    small.joinpath("file").write_bytes(b"data")
+    with open(large.joinpath("file"), "wb") as file:
+        file.truncate(PARALLEL_GZIP_MIN_BYTES)
+
+    tar_file_or_directory(large, "large", tmp_path)
+    tar_file_or_directory(small, "small", tmp_path)
+
+    monkeypatch.setattr(backupbot.utils, "parallel_gzip_program", lambda: None)
+
+    tar_file_or_directory(large, "large", tmp_path, override=True)
+
+    large_tar, small_tar = str(tmp_path.joinpath("large.tar.gz")), str(tmp_path.joinpath("small.tar.gz"))
+    assert calls == [
+        ("tar", "-b", "1024", "-I", "/usr/bin/pigz", "-cf", large_tar, str(large)),
+        ("tar", "-czf", small_tar, str(small)),
+        ("tar", "-czf", large_tar, str(large)),
+    ]
+
+
+def test_size_exceeds(tmp_path: Path) -> None:
+    tmp_path.joinpath("data", "more_data").mkdir(parents=True)
+    tmp_path.joinpath("data", "file").write_bytes(b"12345")
+    tmp_path.joinpath("data", "more_data", "file").write_bytes(b"12345")
+
+    assert size_exceeds(tmp_path.joinpath("data"), 10)
+    assert not size_exceeds(tmp_path.joinpath("data"), 11)
+    assert size_exceeds(tmp_path.joinpath("data", "file"), 5)
+    assert not size_exceeds(tmp_path.joinpath("data", "file"), 6)
+
+
+def test_size_exceeds_skips_unreadable_directories(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    tmp_path.joinpath("data", "unreadable").mkdir(parents=True)
+    tmp_path.joinpath("data", "file").write_bytes(b"12345")
+    tmp_path.joinpath("data", "unreadable", "file").write_bytes(b"12345")
+    scandir = os.scandir
+
+    def scandir_without_permission(path):
+        if path == str(tmp_path.joinpath("data", "unreadable")):
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(backupbot.utils.os, "scandir", scandir_without_permission)
+
+    assert size_exceeds(tmp_path.joinpath("data"), 5)
+    assert not size_exceeds(tmp_path.joinpath("data"), 6)
+
+
+def test_tar_file_or_directory_falls_back_to_gzip_if_size_cannot_be_determined(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    calls: List[tuple] = []
+
+    def run(args, **_):
+        calls.append(args)
+        Path(args[-2]).touch()
+        return subprocess.CompletedProcess(args, 0)
+
+    def raise_permission_error(*_):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(backupbot.utils.subprocess, "run", run)
+    monkeypatch.setattr(backupbot.utils, "parallel_gzip_program", lambda: "/usr/bin/pigz")
+    monkeypatch.setattr(backupbot.utils, "size_exceeds", raise_permission_error)
+    tmp_path.joinpath("data").mkdir()
+
+    tar_file_or_directory(tmp_path.joinpath("data"), "data", tmp_path)
+
+    assert calls == [("tar", "-czf", str(tmp_path.joinpath("data.tar.gz")), str(tmp_path.joinpath("data")))]
+
+
+def test_size_exceeds_reads_every_directory_once(dummy_bind_mount_dir: Path, monkeypatch: MonkeyPatch) -> None:
+    directories = [directory for directory, _, _ in os.walk(dummy_bind_mount_dir)]
+    scanned: List[str] = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(backupbot.utils.os, "scandir", counting_scandir)
+
+    size_exceeds(dummy_bind_mount_dir, 1 << 30)
+
+    assert sorted(scanned) == sorted(directories)
+
+
 def test_tar_file_or_directory_for_file(tmp_path: Path) -> None:
     file = tmp_path.joinpath("file.txt")
     file.touch()
@@ -189,9 +345,7 @@ def test_tar_file_or_directory_does_not_override_existing_files_when_override_no
 
     tar_file_or_directory(file, "file.txt", tmp_path, override=False)
 
-    assert tmp_path.joinpath("file.txt.tar.gz").is_file()
-    assert tmp_path.joinpath("file.txt(1).tar.gz").is_file()
-    assert tmp_path.joinpath("file.txt(2).tar.gz").is_file()
+    assert_tree(tmp_path, {"file.txt.tar.gz": "file", "file.txt(1).tar.gz": "file", "file.txt(2).tar.gz": "file"})
 
 
 def test_path_to_string() -> None:
@@ -201,6 +355,17 @@ def test_path_to_string() -> None:
     assert path_to_string(Path("path/with/name/foo"), num_steps=2, delim="#") == "name#foo"
 
 
+def test_path_to_string_is_memoized() -> None:
+    path_to_string.cache_clear()
+
+    for _ in range(10):
+        assert path_to_string(Path("/path/with/name/foo"), num_steps=1) == "foo"
+
+    cache_info = path_to_string.cache_info()
+    assert cache_info.misses == 1
+    assert cache_info.hits == 9
+
+
 def test_copy_files(tmp_path: Path) -> None:
     source = tmp_path.joinpath("source")
     target_file = tmp_path.joinpath("target_file")
@@ -1,8 +1,11 @@
-import time
+import os
 from pathlib import Path
 from typing import List
 
 import pytest
+from pytest import MonkeyPatch
+
+import backupbot.versioning
 from backupbot.data_structures import FileVersion
 from backupbot.versioning import (
     VERSIONING_TO_PATTERN,
@@ -10,6 +13,7 @@ from backupbot.versioning import (
     get_max_version_number,
     update_version_numbers,
 )
+from tests.utils.file_system import wait_for_ctime_tick
 
 
 def test_get_max_version_number(tmp_path: Path) -> None:
@@ -68,7 +72,7 @@ def test_create_target_names_does_noting_when_list_contains_no_unversioned_file(
     ]
     for file in files:
         file.touch()
-        time.sleep(0.001)
+        wait_for_ctime_tick(file)
 
     assert create_target_names(files, file_ending="txt") == [
         (tmp_path.joinpath("file-0-2.txt"), tmp_path.joinpath("file-0-2.txt")),
@@ -93,7 +97,7 @@ def test_update_version_numbers(tmp_path: Path) -> None:
     for file in files:
         file.touch()
         file.write_text(file.name)
-        time.sleep(0.1)
+        wait_for_ctime_tick(file)
 
     renamed = update_version_numbers(tmp_path, "txt", version_pattern=VERSIONING_TO_PATTERN["d-d"], major=False)
 
@@ -108,3 +112,31 @@ def test_update_version_numbers(tmp_path: Path) -> None:
     assert tmp_path.joinpath("file-0-0.txt").read_text() == "file.txt"
 
     assert len(renamed) == len(files)
+
+
+def test_update_version_numbers_restores_files_staged_by_an_aborted_run(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    for name in ["file-0-0.txt", "file.txt"]:
+        tmp_path.joinpath(name).write_text(name)
+        wait_for_ctime_tick(tmp_path.joinpath(name))
+
+    replace = os.replace
+
+    def abort_after_first_pass(src: str, dst: str) -> None:
+        if not str(src).endswith(".txt"):
+            raise KeyboardInterrupt()  # the second pass renames the staged files to their final names
+        replace(src, dst)
+
+    monkeypatch.setattr(backupbot.versioning.os, "replace", abort_after_first_pass)
+    with pytest.raises(KeyboardInterrupt):
+        update_version_numbers(tmp_path, "txt")
+    monkeypatch.undo()
+
+    assert not list(tmp_path.glob("*.txt"))  # both files are staged
+
+    renamed = update_version_numbers(tmp_path, "txt")
+
+    assert len(renamed) == 2
+    assert sorted(file.name for file in tmp_path.iterdir()) == ["file-0-0.txt", "file-0-1.txt"]
+    assert {file.read_text() for file in tmp_path.iterdir()} == {"file-0-0.txt", "file.txt"}
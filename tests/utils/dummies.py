@@ -1,35 +1,44 @@
-from typing import Callable, Dict, List
+from functools import lru_cache
+from typing import Dict, List
 
 from backupbot.abstract.backup_task import AbstractBackupTask
 from backupbot.abstract.storage_info import AbstractStorageInfo
 
 
-def create_dummy_task(name: str) -> AbstractBackupTask:
-    class DummyBackupTask(AbstractBackupTask):
-        target_dir_name: str = name
+class DummyBackupTask(AbstractBackupTask):
+    target_dir_name: str = "dummy"
 
-        def __init__(self, **kwargs: Dict):
-            pass
+    def __init__(self, **kwargs: Dict):
+        pass
 
-        def __eq__(self, o) -> bool:
-            pass
+    # AbstractBackupTask declares __eq__ abstract, dummies keep object's identity comparison and hashing
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
 
-        def __repr__(self) -> str:
-            return "DummyBackupTask"
+    def __repr__(self) -> str:
+        return "DummyBackupTask"
 
-        def __call__(
-            self, storage_info: Dict[str, AbstractStorageInfo], backup_tasks: Dict[str, List[AbstractBackupTask]]
-        ) -> None:
-            pass
+    def __call__(
+        self, storage_info: Dict[str, AbstractStorageInfo], backup_tasks: Dict[str, List[AbstractBackupTask]]
+    ) -> None:
+        pass
 
-    return DummyBackupTask()
+
+@lru_cache(maxsize=None)
+def create_dummy_task(name: str) -> AbstractBackupTask:
+    # dummies are stateless, hence one shared instance per name
+    # target_dir_name is read from the task's class, hence one subclass per name which only overrides the attribute
+    return type("DummyBackupTask", (DummyBackupTask,), {"target_dir_name": name})()
 
 
 class Containers:
+    __slots__ = ()
+
     def run(self, *args, **kwargs) -> None:
         pass
 
 
 class DummyDockerClient:
-    def __init__(self) -> None:
-        containers = Containers()
+    __slots__ = ()
+
+    containers = Containers()  # stateless, shared by all instances
@@ -0,0 +1,95 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Union
+
+FileTree = Dict[str, Union[str, "FileTree"]]
+
+
+def assert_tree(root: Path, expected: FileTree, exact: bool = False) -> None:
+    """Asserts that the directory contains the expected tree.
+
+    Each directory is read once via os.scandir, entry types are taken from the cached DirEntry information. Leaves are
+    given as "file" or "dir", sub directories whose content should be checked as nested dictionaries:
+
+        >>> assert_tree(root, {"bind_mount1": {"file.tar.gz": "file"}, "bind_mount2": "dir"})
+
+    Args:
+        root (Path): Directory to check.
+        expected (FileTree): Expected directory content.
+        exact (bool, optional): Whether the directories must not contain any other entries. Defaults to False.
+    """
+    with os.scandir(root) as it:
+        entries = {entry.name: entry for entry in it}
+
+    if exact:
+        assert set(entries) == set(expected), f"Unexpected content in '{root}'."
+
+    for name, content in expected.items():
+        assert name in entries, f"'{name}' does not exist in '{root}'."
+        entry = entries[name]
+
+        if content == "file":
+            assert entry.is_file(), f"'{entry.path}' is not a file."
+        else:
+            assert entry.is_dir(), f"'{entry.path}' is not a directory."
+            if isinstance(content, dict):
+                assert_tree(Path(entry.path), content, exact=exact)
+
+
+def make_tree(root: Path, *relative_paths: str) -> None:
+    """Creates empty files and directories below the root directory, including all missing parent directories.
+
+    Paths ending with '/' are created as directories, all other paths as empty files:
+
+        >>> make_tree(root, "services/data/", "services/docker-compose.yaml")
+
+    Args:
+        root (Path): Root directory.
+        relative_paths (str): '/'-separated paths relative to root.
+    """
+    root_path = os.fspath(root)
+
+    for relative_path in relative_paths:
+        path = os.path.join(root_path, relative_path)
+
+        if relative_path.endswith("/"):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "wb").close()
+
+
+def count_entries(directory: Path) -> int:
+    """Counts the entries of a directory (not recursively) without creating Path objects for them.
+
+    Args:
+        directory (Path): Directory.
+
+    Returns:
+        int: Number of files and directories in the directory.
+    """
+    with os.scandir(directory) as it:
+        return sum(1 for _ in it)
+
+
+def wait_for_ctime_tick(file: Path) -> None:
+    """Waits until files created from now on get a later change time (ctime) than the specified file.
+
+    The change time cannot be set via os.utime and its granularity depends on the file system and kernel clock, hence
+    a probe file next to the specified file is touched until its ctime has passed the file's ctime.
+
+    Args:
+        file (Path): File whose ctime later files must exceed.
+    """
+    ctime_ns = file.stat().st_ctime_ns
+    probe = file.with_name(".ctime_probe")
+
+    try:
+        while True:
+            probe.touch()
+            if probe.stat().st_ctime_ns > ctime_ns:
+                return
+            time.sleep(0.0005)
+    finally:
+        probe.unlink(missing_ok=True)